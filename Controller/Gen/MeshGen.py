@@ -1,9 +1,10 @@
+import datetime
 import os
 import numpy as np
-import collada
-import random
-import tkinter as tk
-from tkinter import ttk
+from Controller.Gen.seeding import as_rng
+
+# created/modified date written into every DAE file
+DAE_TIMESTAMP = datetime.datetime(2000, 1, 1)
 
 def smooth_elevations(elevations, num_iterations=1):
     for _ in range(num_iterations):
@@ -18,7 +19,47 @@ def smooth_elevations(elevations, num_iterations=1):
         elevations = smoothed_elevations
     return elevations
 
-def generate_dae_mesh(filepath, size_x=50, size_y=50, min_vertices_x=10, max_vertices_x=20, min_vertices_y=10, max_vertices_y=20, box_position=(25, 30, 5)):
+def _smooth_grid(grid, num_iterations):
+    grid = np.array(grid, dtype=float)
+    for _ in range(num_iterations):
+        # Same 1-2-1 kernel as smooth_elevations, along both axes; edges stay unchanged
+        grid[1:-1, :] = (grid[:-2, :] + 2 * grid[1:-1, :] + grid[2:, :]) / 4
+        grid[:, 1:-1] = (grid[:, :-2] + 2 * grid[:, 1:-1] + grid[:, 2:]) / 4
+    return grid
+
+def _smooth_tile(window, tile, num_iterations):
+    return _smooth_grid(window, num_iterations)
+
+def smooth_heightmap(heightmap, num_iterations=1, pool=None):
+    # 2D counterpart of smooth_elevations. With a GridPool the map is smoothed
+    # in tiles; a halo of one cell per iteration keeps the result exact.
+    num_iterations = int(num_iterations)
+    if pool is None:
+        return _smooth_grid(heightmap, num_iterations)
+    return pool.map_tiles(_smooth_tile, heightmap, dtype=np.float64, halo=num_iterations, num_iterations=num_iterations)
+
+def sample_heightmap(heightmap, num_vertices_x, num_vertices_y):
+    # Bilinearly sample a 2D heightmap at an evenly spaced vertex grid
+    heightmap = np.asarray(heightmap, dtype=float)
+    rows = np.linspace(0, heightmap.shape[0] - 1, num_vertices_y)
+    cols = np.linspace(0, heightmap.shape[1] - 1, num_vertices_x)
+    r0 = np.minimum(rows.astype(int), heightmap.shape[0] - 2) if heightmap.shape[0] > 1 else np.zeros(num_vertices_y, dtype=int)
+    c0 = np.minimum(cols.astype(int), heightmap.shape[1] - 2) if heightmap.shape[1] > 1 else np.zeros(num_vertices_x, dtype=int)
+    r1 = np.minimum(r0 + 1, heightmap.shape[0] - 1)
+    c1 = np.minimum(c0 + 1, heightmap.shape[1] - 1)
+    fr = (rows - r0)[:, None]
+    fc = (cols - c0)[None, :]
+    top = heightmap[np.ix_(r0, c0)] * (1 - fc) + heightmap[np.ix_(r0, c1)] * fc
+    bottom = heightmap[np.ix_(r1, c0)] * (1 - fc) + heightmap[np.ix_(r1, c1)] * fc
+    return top * (1 - fr) + bottom * fr
+
+def generate_dae_mesh(filepath, size_x=50, size_y=50, min_vertices_x=10, max_vertices_x=20, min_vertices_y=10, max_vertices_y=20, box_position=(25, 30, 5), rng=None,
+                      heightmap=None, smoothness=3, tree_positions=None):
+    # rng can be a numpy Generator (see Controller.Gen.seeding), an int seed or None
+    # heightmap is an optional 2D array of elevations; without it the landscape is random
+    import collada
+    rng = as_rng(rng)
+
     # Convert arguments to integers
     min_vertices_x = int(min_vertices_x)
     max_vertices_x = int(max_vertices_x)
@@ -26,14 +67,17 @@ def generate_dae_mesh(filepath, size_x=50, size_y=50, min_vertices_x=10, max_ver
     max_vertices_y = int(max_vertices_y)
     
     # Randomly select the number of vertices along x and y directions
-    num_vertices_x = random.randint(min_vertices_x, max_vertices_x)
-    num_vertices_y = random.randint(min_vertices_y, max_vertices_y)
+    num_vertices_x = int(rng.integers(min_vertices_x, max_vertices_x, endpoint=True))
+    num_vertices_y = int(rng.integers(min_vertices_y, max_vertices_y, endpoint=True))
 
     # Create a new Collada object
     mesh = collada.Collada()
 
     # Set the unit meter in the asset
     mesh.assetInfo.unitname = "meter"
+    # Fixed dates instead of the current time, so the same terrain gives the
+    # same file (and dedupes in Model/blobStore.py)
+    mesh.assetInfo.created = mesh.assetInfo.modified = DAE_TIMESTAMP
 
     # Create a material for the landscape
     effect_landscape = collada.material.Effect("effect_landscape", [], "phong", diffuse=(0.3, 0.5, 0.3), specular=(0, 0, 0))
@@ -74,18 +118,23 @@ def generate_dae_mesh(filepath, size_x=50, size_y=50, min_vertices_x=10, max_ver
     mesh.geometries.append(geom_bottom)
 
     # Generate landscape vertices on top of the flat bottom
+    if heightmap is not None:
+        sampled = sample_heightmap(heightmap, num_vertices_x, num_vertices_y)
     landscape_vertices = []
     for i in range(num_vertices_y):
         for j in range(num_vertices_x):
             x = j * size_x / (num_vertices_x - 1)
             y = i * size_y / (num_vertices_y - 1)
-            # Generate random elevation for the landscape
-            z = random.uniform(0, 8)  # Adjust the range as needed
+            if heightmap is not None:
+                z = sampled[i, j]
+            else:
+                # Generate random elevation for the landscape
+                z = rng.uniform(0, 8)  # Adjust the range as needed
             landscape_vertices.append((x, y, z))
 
     # Smooth the elevations
     elevations = [vertex[2] for vertex in landscape_vertices]
-    smoothed_elevations = smooth_elevations(elevations, num_iterations=3)
+    smoothed_elevations = smooth_elevations(elevations, num_iterations=int(smoothness))
 
     # Update the vertices with smoothed elevations
     for i, vertex in enumerate(landscape_vertices):
@@ -188,7 +237,8 @@ def generate_dae_mesh(filepath, size_x=50, size_y=50, min_vertices_x=10, max_ver
     mesh.materials.append(mat_tree)
 
     # Specify tree positions
-    tree_positions = [(10, 10, 0), (15, 20, 1), (30, 25, 2)]  # Adjust positions as needed
+    if tree_positions is None:
+        tree_positions = [(10, 10, 0), (15, 20, 1), (30, 25, 2)]  # Adjust positions as needed
 
     # Create a scene
     geomnode_bottom = collada.scene.GeometryNode(geom_bottom, [mat_landscape])
@@ -201,13 +251,13 @@ def generate_dae_mesh(filepath, size_x=50, size_y=50, min_vertices_x=10, max_ver
     myscene = collada.scene.Scene("myscene", [node_bottom, node_landscape, node_box])
 
     # Add tree nodes to the scene
-    for tree_position in tree_positions:
+    for index, tree_position in enumerate(tree_positions):
         # Create a geometry node for the tree
         geomnode_tree = collada.scene.GeometryNode(geom_tree, [mat_tree])
 
         # Create a node for the tree with its position
-        tree_node = collada.scene.Node("tree_node", children=[geomnode_tree])
-        tree_node.translation = tree_position  # Set the position of the tree
+        translate = collada.scene.TranslateTransform(*[float(v) for v in tree_position])
+        tree_node = collada.scene.Node(f"tree_node_{index}", children=[geomnode_tree], transforms=[translate])
 
         # Add the tree node to the scene
         myscene.nodes.append(tree_node)
@@ -252,60 +302,65 @@ def update_min_slider(max_slider_value, min_slider_scale):
     min_slider_scale.configure(to=max_slider_value)
     update_slider_labels()
 
-# GUI setup
-window = tk.Tk()
-window.title("Mesh Generator")
-
-# Slider for size along X
-size_x_scale = ttk.Scale(window, from_=10, to=100, length=200, orient="horizontal", value=10)
-size_x_scale.grid(row=0, column=0, padx=10, pady=10)
-size_x_label = ttk.Label(window, text=f"Size X: {size_x_scale.get():.2f}")
-size_x_label.grid(row=0, column=1)
-
-# Slider for size along Y
-size_y_scale = ttk.Scale(window, from_=10, to=100, length=200, orient="horizontal", value=10)
-size_y_scale.grid(row=1, column=0, padx=10, pady=10)
-size_y_label = ttk.Label(window, text=f"Size Y: {size_y_scale.get():.2f}")
-size_y_label.grid(row=1, column=1)
-
-# Slider for min vertices along X
-min_vertices_x_scale = ttk.Scale(window, from_=5, to=20, length=200, orient="horizontal", value=5)
-min_vertices_x_scale.grid(row=2, column=0, padx=10, pady=10)
-min_vertices_x_label = ttk.Label(window, text=f"Min Vertices X: {min_vertices_x_scale.get():.2f}")
-min_vertices_x_label.grid(row=2, column=1)
-
-# Slider for max vertices along X
-max_vertices_x_scale = ttk.Scale(window, from_=10, to=30, length=200, orient="horizontal", value=10)
-max_vertices_x_scale.grid(row=3, column=0, padx=10, pady=10)
-max_vertices_x_label = ttk.Label(window, text=f"Max Vertices X: {max_vertices_x_scale.get():.2f}")
-max_vertices_x_label.grid(row=3, column=1)
-
-# Slider for min vertices along Y
-min_vertices_y_scale = ttk.Scale(window, from_=5, to=20, length=200, orient="horizontal", value=5)
-min_vertices_y_scale.grid(row=4, column=0, padx=10, pady=10)
-min_vertices_y_label = ttk.Label(window, text=f"Min Vertices Y: {min_vertices_y_scale.get():.2f}")
-min_vertices_y_label.grid(row=4, column=1)
-
-# Slider for max vertices along Y
-max_vertices_y_scale = ttk.Scale(window, from_=10, to=30, length=200, orient="horizontal", value=10)
-max_vertices_y_scale.grid(row=5, column=0, padx=10, pady=10)
-max_vertices_y_label = ttk.Label(window, text=f"Max Vertices Y: {max_vertices_y_scale.get():.2f}")
-max_vertices_y_label.grid(row=5, column=1)
-
-generate_button = ttk.Button(window, text="Generate Mesh", command=generate_mesh)
-generate_button.grid(row=8, column=1)  # Adjust row and column as needed
-
-update_slider_labels()  # Update labels with initial values
-
-# Continuous update of slider labels
-size_x_scale.bind("<ButtonRelease-1>", lambda event: update_slider_labels())
-size_y_scale.bind("<ButtonRelease-1>", lambda event: update_slider_labels())
-min_vertices_x_scale.bind("<ButtonRelease-1>", lambda event: update_slider_labels())
-max_vertices_x_scale.bind("<ButtonRelease-1>", lambda event: [update_slider_labels(), update_min_slider(max_vertices_x_scale.get(), min_vertices_x_scale)])
-min_vertices_y_scale.bind("<ButtonRelease-1>", lambda event: update_slider_labels())
-max_vertices_y_scale.bind("<ButtonRelease-1>", lambda event: [update_slider_labels(), update_min_slider(max_vertices_y_scale.get(), min_vertices_y_scale)])
-
-window.mainloop()
+if __name__ == "__main__":
+    # Tk is only needed for the standalone window, not for generate_dae_mesh
+    import tkinter as tk
+    from tkinter import ttk
+
+    # GUI setup
+    window = tk.Tk()
+    window.title("Mesh Generator")
+
+    # Slider for size along X
+    size_x_scale = ttk.Scale(window, from_=10, to=100, length=200, orient="horizontal", value=10)
+    size_x_scale.grid(row=0, column=0, padx=10, pady=10)
+    size_x_label = ttk.Label(window, text=f"Size X: {size_x_scale.get():.2f}")
+    size_x_label.grid(row=0, column=1)
+
+    # Slider for size along Y
+    size_y_scale = ttk.Scale(window, from_=10, to=100, length=200, orient="horizontal", value=10)
+    size_y_scale.grid(row=1, column=0, padx=10, pady=10)
+    size_y_label = ttk.Label(window, text=f"Size Y: {size_y_scale.get():.2f}")
+    size_y_label.grid(row=1, column=1)
+
+    # Slider for min vertices along X
+    min_vertices_x_scale = ttk.Scale(window, from_=5, to=20, length=200, orient="horizontal", value=5)
+    min_vertices_x_scale.grid(row=2, column=0, padx=10, pady=10)
+    min_vertices_x_label = ttk.Label(window, text=f"Min Vertices X: {min_vertices_x_scale.get():.2f}")
+    min_vertices_x_label.grid(row=2, column=1)
+
+    # Slider for max vertices along X
+    max_vertices_x_scale = ttk.Scale(window, from_=10, to=30, length=200, orient="horizontal", value=10)
+    max_vertices_x_scale.grid(row=3, column=0, padx=10, pady=10)
+    max_vertices_x_label = ttk.Label(window, text=f"Max Vertices X: {max_vertices_x_scale.get():.2f}")
+    max_vertices_x_label.grid(row=3, column=1)
+
+    # Slider for min vertices along Y
+    min_vertices_y_scale = ttk.Scale(window, from_=5, to=20, length=200, orient="horizontal", value=5)
+    min_vertices_y_scale.grid(row=4, column=0, padx=10, pady=10)
+    min_vertices_y_label = ttk.Label(window, text=f"Min Vertices Y: {min_vertices_y_scale.get():.2f}")
+    min_vertices_y_label.grid(row=4, column=1)
+
+    # Slider for max vertices along Y
+    max_vertices_y_scale = ttk.Scale(window, from_=10, to=30, length=200, orient="horizontal", value=10)
+    max_vertices_y_scale.grid(row=5, column=0, padx=10, pady=10)
+    max_vertices_y_label = ttk.Label(window, text=f"Max Vertices Y: {max_vertices_y_scale.get():.2f}")
+    max_vertices_y_label.grid(row=5, column=1)
+
+    generate_button = ttk.Button(window, text="Generate Mesh", command=generate_mesh)
+    generate_button.grid(row=8, column=1)  # Adjust row and column as needed
+
+    update_slider_labels()  # Update labels with initial values
+
+    # Continuous update of slider labels
+    size_x_scale.bind("<ButtonRelease-1>", lambda event: update_slider_labels())
+    size_y_scale.bind("<ButtonRelease-1>", lambda event: update_slider_labels())
+    min_vertices_x_scale.bind("<ButtonRelease-1>", lambda event: update_slider_labels())
+    max_vertices_x_scale.bind("<ButtonRelease-1>", lambda event: [update_slider_labels(), update_min_slider(max_vertices_x_scale.get(), min_vertices_x_scale)])
+    min_vertices_y_scale.bind("<ButtonRelease-1>", lambda event: update_slider_labels())
+    max_vertices_y_scale.bind("<ButtonRelease-1>", lambda event: [update_slider_labels(), update_min_slider(max_vertices_y_scale.get(), min_vertices_y_scale)])
+
+    window.mainloop()
 
 
 
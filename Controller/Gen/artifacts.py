@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from Controller.Gen.presets import canonical_json
+
+# Bump whenever a change to the pipeline changes its output for the same
+# preset, so stale artifacts are never served
+ALGORITHM_VERSION = 5
+
+DEFAULT_CACHE_DIR = os.path.join("GeneratedMeshes", ".cache")
+DEFAULT_MAX_BYTES = 1024 ** 3
+
+ENTRY_META = "entry.json"
+ELEVATION_NAME = "elevation.npy"
+THUMBNAIL_NAME = "thumbnail.png"
+THUMBNAIL_SIZE = 256
+
+
+def artifact_key(preset_data):
+    # Canonical preset plus algorithm version, so slider formatting and key
+    # order don't matter but algorithm changes do
+    text = f"{ALGORITHM_VERSION}:{canonical_json(preset_data)}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_thumbnail(elevation, size=THUMBNAIL_SIZE):
+    """
+    Hillshade thumbnail of an elevation grid with a long edge of at most size pixels.
+    """
+    from Controller.Gen.preview import hillshade
+
+    rows, cols = elevation.shape
+    step = max(int(np.ceil(max(rows, cols) / float(size))), 1)
+    return hillshade(elevation[::step, ::step], cell_size=float(step))
+
+
+class ArtifactCache:
+    """
+    On-disk store of generated artifacts keyed by artifact_key.
+
+    Every entry is a directory holding the pipeline's output files, the
+    final elevation grid (elevation.npy) and a thumbnail. entry.json is
+    written last, so half-written entries are never returned. Reading an
+    entry touches it; once the store grows past max_bytes the least
+    recently used entries are deleted; max_bytes=None never evicts.
+
+    Safe to share between the GUI thread and a generation thread.
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.root, key)
+
+    def _read_meta(self, key):
+        try:
+            with open(os.path.join(self._entry_dir(key), ENTRY_META), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, preset_data):
+        """
+        Look up the artifacts of a preset.
+
+        Returns:
+        - A dict with the entry's "dir", "files" (names of the pipeline
+          output files) and "bytes", or None if the preset isn't cached.
+        """
+        key = artifact_key(preset_data)
+        with self._lock:
+            meta = self._read_meta(key)
+            if meta is None:
+                return None
+            os.utime(os.path.join(self._entry_dir(key), ENTRY_META))
+        meta["dir"] = self._entry_dir(key)
+        return meta
+
+    def elevation(self, preset_data):
+        # Memory-mapped elevation grid of a cached preset, or None
+        entry = self.get(preset_data)
+        if entry is None:
+            return None
+        return np.load(os.path.join(entry["dir"], ELEVATION_NAME), mmap_mode="r")
+
+    def thumbnail(self, preset_data):
+        # Thumbnail of a cached preset as a uint8 array, or None
+        entry = self.get(preset_data)
+        if entry is None:
+            return None
+        from PIL import Image
+        with Image.open(os.path.join(entry["dir"], THUMBNAIL_NAME)) as image:
+            return np.asarray(image)
+
+    def put(self, preset_data, source_dir, files, elevation):
+        """
+        Store the output of a pipeline run.
+
+        Parameters:
+        - preset_data: The preset the files were generated from.
+        - source_dir: Directory holding the generated files.
+        - files: Names of the files in source_dir to keep.
+        - elevation: Final elevation grid; stored with a thumbnail of it.
+        """
+        from PIL import Image
+
+        key = artifact_key(preset_data)
+        entry_dir = self._entry_dir(key)
+        staging_dir = f"{entry_dir}.tmp{os.getpid()}-{threading.get_ident()}"
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        os.makedirs(staging_dir)
+        for name in files:
+            shutil.copyfile(os.path.join(source_dir, name), os.path.join(staging_dir, name))
+        np.save(os.path.join(staging_dir, ELEVATION_NAME), np.asarray(elevation, dtype=np.float32))
+        Image.fromarray(make_thumbnail(np.asarray(elevation, dtype=float))).save(os.path.join(staging_dir, THUMBNAIL_NAME))
+        size = sum(os.path.getsize(os.path.join(staging_dir, name)) for name in os.listdir(staging_dir))
+        meta = {
+            "key": key,
+            "algorithm_version": ALGORITHM_VERSION,
+            "files": list(files),
+            "bytes": size,
+            "created": time.time(),
+        }
+        with open(os.path.join(staging_dir, ENTRY_META), "w") as f:
+            json.dump(meta, f)
+
+        with self._lock:
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(staging_dir, entry_dir)
+            self._evict(keep=key)
+
+    def copy_to(self, entry, output_dir):
+        # Copy a cached entry's pipeline files into an output directory
+        os.makedirs(output_dir, exist_ok=True)
+        for name in entry["files"]:
+            shutil.copyfile(os.path.join(entry["dir"], name), os.path.join(output_dir, name))
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(meta["bytes"] for _, meta, _ in self._entries())
+
+    def _entries(self):
+        # (key, meta, last use) of every complete entry
+        if not os.path.isdir(self.root):
+            return []
+        entries = []
+        for key in os.listdir(self.root):
+            meta = self._read_meta(key)
+            if meta is not None:
+                last_used = os.path.getmtime(os.path.join(self._entry_dir(key), ENTRY_META))
+                entries.append((key, meta, last_used))
+        return entries
+
+    def _evict(self, keep=None):
+        if self.max_bytes is None:
+            return
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(meta["bytes"] for _, meta, _ in entries)
+        for key, meta, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            total -= meta["bytes"]
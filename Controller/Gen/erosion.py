@@ -0,0 +1,321 @@
+import numpy as np
+from Controller.Gen.gridpool import GridPool
+from Controller.Gen.seeding import as_rng, make_rng
+
+# Droplet model parameters, in heightmap units per step
+HYDRAULIC_DEFAULTS = {
+    "max_lifetime": 30,
+    "inertia": 0.05,
+    "capacity": 4.0,
+    "min_capacity": 0.01,
+    "erode_speed": 0.3,
+    "deposit_speed": 0.3,
+    "evaporate_speed": 0.01,
+    "gravity": 4.0,
+}
+
+
+def _sample(heightmap, x, y):
+    # Bilinear height and gradient at (x, y); callers keep x, y in [0, n - 1)
+    width = heightmap.shape[1]
+    ix = x.astype(np.intp)
+    iy = y.astype(np.intp)
+    fx = x - ix
+    fy = y - iy
+    flat = heightmap.ravel()
+    corner = iy * width + ix
+    h00 = flat[corner]
+    h10 = flat[corner + 1]
+    h01 = flat[corner + width]
+    h11 = flat[corner + width + 1]
+    grad_x = (h10 - h00) * (1 - fy) + (h11 - h01) * fy
+    grad_y = (h01 - h00) * (1 - fx) + (h11 - h10) * fx
+    height = h00 * (1 - fx) * (1 - fy) + h10 * fx * (1 - fy) + h01 * (1 - fx) * fy + h11 * fx * fy
+    return height, grad_x, grad_y, corner, fx, fy
+
+
+def _splat(heightmap, corner, fx, fy, amount):
+    # Scatter-add amount onto the 4 cells around each droplet, bilinearly weighted
+    width = heightmap.shape[1]
+    flat = heightmap.ravel()
+    np.add.at(flat, corner, amount * (1 - fx) * (1 - fy))
+    np.add.at(flat, corner + 1, amount * fx * (1 - fy))
+    np.add.at(flat, corner + width, amount * (1 - fx) * fy)
+    np.add.at(flat, corner + width + 1, amount * fx * fy)
+
+
+def _crowd(heightmap, corner, fx, fy):
+    # How many droplets of the batch share each droplet's 4 cells, weighted
+    # like _splat: 1 for a droplet on its own, k for k droplets at one spot
+    width = heightmap.shape[1]
+    cells = np.concatenate([corner, corner + 1, corner + width, corner + width + 1])
+    weight = np.concatenate([(1 - fx) * (1 - fy), fx * (1 - fy), (1 - fx) * fy, fx * fy])
+    # Only the touched cells are counted, so the cost follows the batch, not the map
+    _, touched = np.unique(cells, return_inverse=True)
+    occupancy = np.bincount(touched, weight)
+    count = len(corner)
+    shared = (weight * occupancy[touched]).reshape(4, count).sum(axis=0)
+    return shared / (weight * weight).reshape(4, count).sum(axis=0)
+
+
+def _run_batch(heightmap, x, y, params):
+    rows, cols = heightmap.shape
+    count = len(x)
+    dir_x = np.zeros(count)
+    dir_y = np.zeros(count)
+    speed = np.ones(count)
+    water = np.ones(count)
+    sediment = np.zeros(count)
+
+    for _ in range(int(params["max_lifetime"])):
+        height, grad_x, grad_y, corner, fx, fy = _sample(heightmap, x, y)
+
+        # Steer downhill, keeping some of the previous direction
+        dir_x = dir_x * params["inertia"] - grad_x * (1 - params["inertia"])
+        dir_y = dir_y * params["inertia"] - grad_y * (1 - params["inertia"])
+        length = np.hypot(dir_x, dir_y)
+        moving = length > 0
+        dir_x = np.divide(dir_x, length, out=np.zeros(count), where=moving)
+        dir_y = np.divide(dir_y, length, out=np.zeros(count), where=moving)
+        new_x = x + dir_x
+        new_y = y + dir_y
+
+        # Droplets that stop or leave the map drop their sediment where they are
+        alive = moving & (new_x >= 0) & (new_x < cols - 1) & (new_y >= 0) & (new_y < rows - 1)
+        if not alive.all():
+            dead = ~alive
+            _splat(heightmap, corner[dead], fx[dead], fy[dead], sediment[dead])
+            keep = alive
+            x, y, new_x, new_y = x[keep], y[keep], new_x[keep], new_y[keep]
+            dir_x, dir_y, speed, water, sediment = dir_x[keep], dir_y[keep], speed[keep], water[keep], sediment[keep]
+            height, corner, fx, fy = height[keep], corner[keep], fx[keep], fy[keep]
+            count = len(x)
+            if count == 0:
+                break
+
+        new_height = _sample(heightmap, new_x, new_y)[0]
+        delta = new_height - height
+        capacity = np.maximum(-delta * speed * water * params["capacity"], params["min_capacity"])
+
+        # Deposit when carrying too much or flowing uphill, otherwise erode
+        depositing = (sediment > capacity) | (delta > 0)
+        deposit = np.where(delta > 0, np.minimum(delta, sediment), (sediment - capacity) * params["deposit_speed"])
+        erode = np.minimum((capacity - sediment) * params["erode_speed"], -delta)
+        # Droplets sharing a cell split what they erode or deposit there,
+        # otherwise a crowded batch digs or fills it many times over
+        change = np.where(depositing, deposit, -erode) / _crowd(heightmap, corner, fx, fy)
+        _splat(heightmap, corner, fx, fy, change)
+        sediment = sediment - change
+
+        speed = np.sqrt(np.maximum(speed * speed - delta * params["gravity"], 0))
+        water = water * (1 - params["evaporate_speed"])
+        x, y = new_x, new_y
+
+    # Droplets that reach the end of their lifetime leave their load behind
+    if count:
+        _, _, _, corner, fx, fy = _sample(heightmap, x, y)
+        _splat(heightmap, corner, fx, fy, sediment)
+
+
+def hydraulic_erosion(heightmap, num_droplets=50000, rng=None, batch_size=8192, spawn_region=None, **params):
+    """
+    Erode a heightmap with particle-based hydraulic erosion.
+
+    Droplets are simulated batch_size at a time as arrays: every step looks
+    up heights and gradients for the whole batch, then scatter-adds the
+    eroded or deposited sediment back onto the grid. Droplets in one batch
+    do not see each other's changes until the next step.
+
+    Parameters:
+    - heightmap: 2D float array, eroded in place.
+    - num_droplets: Droplet budget; more droplets carve deeper channels.
+    - rng: Generator, int seed or None (see Controller.Gen.seeding).
+    - batch_size: Droplets simulated together; bounds temporary memory.
+    - spawn_region: Optional (row0, row1, col0, col1) limiting where droplets
+      start, used by the tiled version to spawn only inside a tile.
+    - params: Overrides for HYDRAULIC_DEFAULTS.
+
+    Returns:
+    - heightmap, for chaining.
+    """
+    rng = as_rng(rng)
+    settings = dict(HYDRAULIC_DEFAULTS)
+    settings.update(params)
+    rows, cols = heightmap.shape
+    if rows < 2 or cols < 2:
+        return heightmap
+    # Scatter-adds go through ravel(), which must be a view of a float buffer
+    work = heightmap
+    if not (heightmap.flags.c_contiguous and heightmap.dtype.kind == 'f'):
+        work = np.ascontiguousarray(heightmap, dtype=np.float64)
+    row0, row1, col0, col1 = spawn_region or (0, rows - 1, 0, cols - 1)
+
+    remaining = int(num_droplets)
+    while remaining > 0:
+        count = min(batch_size, remaining)
+        x = rng.uniform(col0, min(col1, cols - 1), count)
+        y = rng.uniform(row0, min(row1, rows - 1), count)
+        # uniform() can return the upper bound; keep the bilinear corners on the map
+        np.minimum(x, np.nextafter(cols - 1, 0), out=x)
+        np.minimum(y, np.nextafter(rows - 1, 0), out=y)
+        _run_batch(work, x, y, settings)
+        remaining -= count
+    if work is not heightmap:
+        heightmap[...] = work
+    return heightmap
+
+
+def _hydraulic_tile(window, tile, droplets_per_cell, seed, params):
+    # GridPool stage: droplets start in the tile's core and may run into the halo
+    r0, r1, c0, c1 = tile.core
+    w0, v0 = tile.bounds[0], tile.bounds[2]
+    region = (r0 - w0, r1 - w0, c0 - v0, c1 - v0)
+    droplets = int(round(droplets_per_cell * (r1 - r0) * (c1 - c0)))
+    rng = make_rng(seed, "erosion", "hydraulic", tile.row, tile.col)
+    return hydraulic_erosion(window.astype(np.float64), droplets, rng=rng, spawn_region=region, **params)
+
+
+def hydraulic_erosion_tiled(heightmap, num_droplets=50000, seed=0, tile_size=512, halo=32, workers=None, pool=None, **params):
+    """
+    Hydraulic erosion split into tiles that run in parallel processes.
+
+    Each tile is eroded together with a halo of surrounding cells so
+    droplets can flow across its border; only the tile's own cells are
+    kept. The droplet budget is shared out by tile area and every tile uses
+    its own seed stream, so the result does not depend on the number of
+    workers.
+
+    Parameters:
+    - pool: GridPool to run on; a temporary one with workers processes is
+      used when omitted.
+
+    Returns:
+    - heightmap, eroded in place.
+    """
+    rows, cols = heightmap.shape
+    owned = pool is None
+    pool = pool or GridPool(workers)
+    try:
+        eroded = pool.map_tiles(_hydraulic_tile, heightmap, dtype=np.float64, tile_size=tile_size, halo=halo,
+                                droplets_per_cell=num_droplets / float(rows * cols), seed=seed, params=params)
+    finally:
+        if owned:
+            pool.close()
+    heightmap[...] = eroded
+    return heightmap
+
+
+# The 8 neighbours and their distances, for thermal erosion
+_NEIGHBOURS = [(dy, dx, np.float32(np.hypot(dy, dx))) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx]
+
+
+def _pair_slices(dy, dx):
+    # Slices selecting every cell that has a neighbour at (dy, dx), and that neighbour
+    def cell(offset):
+        return slice(None, -offset) if offset > 0 else slice(-offset, None) if offset < 0 else slice(None)
+
+    def neighbour(offset):
+        return slice(offset, None) if offset > 0 else slice(None, offset) if offset < 0 else slice(None)
+
+    return (cell(dy), cell(dx)), (neighbour(dy), neighbour(dx))
+
+
+def thermal_erosion(heightmap, iterations=50, talus=1.0, strength=0.5, tolerance=None):
+    """
+    Relax slopes steeper than the talus angle by moving material downhill.
+
+    Every iteration works on the whole grid with shifted-array operations:
+    one pass finds, for each cell, how far each of its 8 neighbours lies
+    below the talus slope; a second pass moves strength * (largest excess)
+    to those neighbours in proportion to their excess. Material is
+    conserved.
+
+    Parameters:
+    - heightmap: 2D array, relaxed in place. float32 C-contiguous input is
+      used directly; anything else is worked on as float32 and copied back.
+    - iterations: Maximum number of iterations.
+    - talus: Largest stable height difference between adjacent cells
+      (diagonal neighbours allow talus * sqrt(2)).
+    - strength: Fraction of the excess moved per iteration, 0 to 0.5 is stable.
+    - tolerance: Stop early once the steepest excess slope changes by less
+      than this between iterations.
+
+    Returns:
+    - heightmap, for chaining.
+    """
+    work = heightmap
+    if not (heightmap.dtype == np.float32 and heightmap.flags.c_contiguous):
+        work = np.ascontiguousarray(heightmap, dtype=np.float32)
+    talus = np.float32(talus)
+    strength = np.float32(strength)
+    total = np.empty_like(work)
+    steepest = np.empty_like(work)
+    scratch = np.empty_like(work)
+    moved = np.empty_like(work)
+    pairs = [(_pair_slices(dy, dx), distance) for dy, dx, distance in _NEIGHBOURS]
+
+    previous = None
+    for _ in range(int(iterations)):
+        total.fill(0)
+        steepest.fill(0)
+        # Pass 1: summed and largest excess height over the talus slope
+        for (cell, neighbour), distance in pairs:
+            excess = scratch[cell]
+            np.subtract(work[cell], work[neighbour], out=excess)
+            excess -= talus * distance
+            np.maximum(excess, 0, out=excess)
+            total[cell] += excess
+            np.maximum(steepest[cell], excess, out=steepest[cell])
+
+        current = float(steepest.max())
+        if current <= 0:
+            break
+        if tolerance is not None and previous is not None and abs(previous - current) < tolerance:
+            break
+        previous = current
+
+        # moved / total is the share of each unit of excess that is transferred
+        np.divide(steepest * strength, total, out=total, where=total > 0)
+        # Pass 2: recompute the excess on the unchanged heights, then transfer
+        moved.fill(0)
+        for (cell, neighbour), distance in pairs:
+            excess = scratch[cell]
+            np.subtract(work[cell], work[neighbour], out=excess)
+            excess -= talus * distance
+            np.maximum(excess, 0, out=excess)
+            excess *= total[cell]
+            moved[cell] -= excess
+            moved[neighbour] += excess
+        work += moved
+
+    if work is not heightmap:
+        heightmap[...] = work
+    return heightmap
+
+
+def _thermal_tile(window, tile, iterations, talus, strength, tolerance):
+    return thermal_erosion(window.astype(np.float32), iterations, talus, strength, tolerance)
+
+
+def thermal_erosion_tiled(heightmap, iterations=50, talus=1.0, strength=0.5, tolerance=None, tile_size=256, workers=None, pool=None):
+    """
+    thermal_erosion run tile by tile on a GridPool.
+
+    A cell's transfer depends on its neighbours' neighbours, so information
+    travels two cells per iteration and a halo of 2 * iterations makes every
+    tile's core match the whole-map result. tolerance is checked per tile,
+    which can end tiles at slightly different iterations.
+
+    Returns:
+    - heightmap, relaxed in place.
+    """
+    owned = pool is None
+    pool = pool or GridPool(workers)
+    try:
+        relaxed = pool.map_tiles(_thermal_tile, heightmap, dtype=np.float32, tile_size=tile_size, halo=2 * int(iterations),
+                                 iterations=int(iterations), talus=talus, strength=strength, tolerance=tolerance)
+    finally:
+        if owned:
+            pool.close()
+    heightmap[...] = relaxed
+    return heightmap
@@ -0,0 +1,171 @@
+import os
+from collections import namedtuple
+import numpy as np
+
+# One unit of work: its index in the tile grid, the cells it owns (core) and
+# the cells it gets to read (bounds = core grown by the halo, clipped to the map).
+# Both are (row0, row1, col0, col1).
+Tile = namedtuple("Tile", ["row", "col", "core", "bounds"])
+
+# Describes an array living in shared memory, small enough to pickle per task
+_SharedSpec = namedtuple("_SharedSpec", ["name", "shape", "dtype"])
+
+
+def tile_layout(shape, tile_size=256, halo=0):
+    """
+    Split a grid into Tiles.
+
+    tile_size is an int or a (rows, cols) pair. The layout only depends on
+    the shape and these arguments, never on the number of workers.
+    """
+    rows, cols = shape[:2]
+    tile_rows, tile_cols = (tile_size, tile_size) if np.isscalar(tile_size) else tile_size
+    tiles = []
+    for tile_row, r0 in enumerate(range(0, rows, tile_rows)):
+        for tile_col, c0 in enumerate(range(0, cols, tile_cols)):
+            r1, c1 = min(r0 + tile_rows, rows), min(c0 + tile_cols, cols)
+            bounds = (max(r0 - halo, 0), min(r1 + halo, rows), max(c0 - halo, 0), min(c1 + halo, cols))
+            tiles.append(Tile(tile_row, tile_col, (r0, r1, c0, c1), bounds))
+    return tiles
+
+
+def _attach(spec):
+    from multiprocessing import shared_memory
+
+    # Pool workers share the parent's resource tracker, and the parent
+    # unlinks every block after the call, so nothing to unregister here.
+    shm = shared_memory.SharedMemory(name=spec.name)
+    return shm, np.ndarray(spec.shape, dtype=spec.dtype, buffer=shm.buf)
+
+
+def _run_tile(stage, tile, source, output, kwargs):
+    # Runs in the calling process (arrays) or in a worker (_SharedSpecs)
+    handles = []
+
+    def resolve(value):
+        if isinstance(value, _SharedSpec):
+            shm, array = _attach(value)
+            handles.append(shm)
+            return array
+        return value
+
+    try:
+        source = resolve(source)
+        output = resolve(output)
+        kwargs = {key: resolve(value) for key, value in kwargs.items()}
+        w0, w1, v0, v1 = tile.bounds
+        r0, r1, c0, c1 = tile.core
+        # Stages may work in place, so they get a private copy of their window
+        window = None if source is None else np.array(source[w0:w1, v0:v1])
+        result = stage(window, tile, **kwargs)
+        output[r0:r1, c0:c1] = result[r0 - w0:r1 - w0, c0 - v0:c1 - v0]
+    finally:
+        # Views into the blocks must be gone before they can be closed
+        source = output = kwargs = window = result = None
+        for shm in handles:
+            shm.close()
+
+
+class GridPool:
+    """
+    Process pool for running grid stages over overlapping tiles.
+
+    Arrays are placed in multiprocessing.shared_memory once per call;
+    workers read their tile window (core plus halo) straight from it and
+    write their core back into a shared output grid, so no heightmap data
+    is pickled. A stage is any module-level function
+
+        stage(window, tile, **kwargs) -> array shaped like tile.bounds
+
+    where window is a copy of source[tile.bounds] (None when the call has
+    no source grid). ndarray kwargs are shared too, for stages that need to
+    read more than their window, e.g. resampling. Because results only
+    depend on the tile layout, they are identical for any worker count.
+
+    Use as a context manager so the workers are reused across stages:
+
+        with GridPool(workers=8) as pool:
+            heightmap = pool.map_tiles(some_stage, heightmap, halo=16)
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            from concurrent.futures import ProcessPoolExecutor
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def map_tiles(self, stage, source=None, shape=None, dtype=None, tile_size=256, halo=0, **kwargs):
+        """
+        Run stage over every tile of the output grid and gather the result.
+
+        Parameters:
+        - stage: Module-level function, see the class docstring.
+        - source: Optional input grid; each stage call gets a haloed window of it.
+        - shape, dtype: Output grid; default to the source's.
+        - tile_size: Tile edge, or (rows, cols).
+        - halo: Extra cells around each tile that the stage can read.
+        - kwargs: Passed to every stage call; ndarrays go through shared memory.
+
+        Returns:
+        - The output grid as a regular numpy array.
+        """
+        shape = tuple(shape if shape is not None else source.shape)
+        dtype = np.dtype(dtype if dtype is not None else (source.dtype if source is not None else np.float64))
+        tiles = tile_layout(shape, tile_size, halo)
+
+        if self.workers <= 1 or len(tiles) <= 1:
+            output = np.empty(shape, dtype=dtype)
+            for tile in tiles:
+                _run_tile(stage, tile, source, output, kwargs)
+            return output
+
+        from multiprocessing import shared_memory
+
+        blocks = []
+
+        def allocate(shape, dtype):
+            shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+            blocks.append(shm)
+            return _SharedSpec(shm.name, shape, dtype), np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+        def share(array):
+            spec, view = allocate(array.shape, array.dtype)
+            view[...] = array
+            return spec
+
+        try:
+            source_spec = None if source is None else share(np.asarray(source))
+            output_spec, output = allocate(shape, dtype)
+            shared_kwargs = {
+                key: share(value) if isinstance(value, np.ndarray) else value
+                for key, value in kwargs.items()
+            }
+
+            executor = self._get_executor()
+            futures = [
+                executor.submit(_run_tile, stage, tile, source_spec, output_spec, shared_kwargs)
+                for tile in tiles
+            ]
+            for future in futures:
+                future.result()
+            return np.array(output)
+        finally:
+            output = None
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
@@ -0,0 +1,165 @@
+# GUI-free heightmap -> mesh functions used by the "mesh generation based on noise"
+# viewer script and by headless tools. Pillow, scipy and pyvista are imported
+# on first use so importing this module does not pull them in.
+import os
+import numpy as np
+
+# Rows of context read above and below each chunk. The cubic spline prefilter
+# is recursive, but its influence decays by ~0.27 per sample, so 16 rows make
+# chunked output match a whole-map prefilter to ~1e-9.
+SPLINE_HALO = 16
+
+# Default sample type of headerless raw heightmaps, by file extension
+RAW_DTYPES = {
+    '.raw': '<u2',
+    '.r16': '<u2',
+    '.r32': '<f4',
+    '.f32': '<f4',
+}
+
+# Pillow modes that already hold a single channel of height data
+_SINGLE_CHANNEL_MODES = ('L', 'I', 'I;16', 'I;16L', 'I;16B', 'F')
+
+
+def open_heightmap(path, shape=None, dtype=None):
+    """
+    Open a heightmap without losing precision.
+
+    Parameters:
+    - path: .npy, headerless raw (.raw/.r16 uint16, .r32/.f32 float32) or any
+      image Pillow can read (8/16-bit PNG, 16-bit or float TIFF, ...).
+    - shape: (rows, cols) of a raw file. Defaults to a square map inferred
+      from the file size.
+    - dtype: Sample type of a raw file, overriding the extension default.
+
+    Returns:
+    - A 2D array. .npy and raw files are memory-mapped read-only, so only the
+      windows that are actually read are paged in. Compressed images have
+      to be decoded into memory; convert very large ones to .npy or raw first.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.npy':
+        return np.load(path, mmap_mode='r')
+    if ext in RAW_DTYPES or dtype is not None:
+        dtype = np.dtype(dtype or RAW_DTYPES.get(ext, '<u2'))
+        if shape is None:
+            samples = os.path.getsize(path) // dtype.itemsize
+            side = int(round(np.sqrt(samples)))
+            if side * side != samples:
+                raise ValueError(f"{path}: raw heightmap is not square, pass shape=(rows, cols)")
+            shape = (side, side)
+        return np.memmap(path, dtype=dtype, mode='r', shape=tuple(shape))
+
+    from PIL import Image
+    max_pixels = Image.MAX_IMAGE_PIXELS
+    Image.MAX_IMAGE_PIXELS = None  # DEM tiles are legitimately huge
+    try:
+        with Image.open(path) as img:
+            if img.mode not in _SINGLE_CHANNEL_MODES:
+                img = img.convert('L')  # Colour images have no extra precision to keep
+            heightmap = np.array(img)
+    finally:
+        Image.MAX_IMAGE_PIXELS = max_pixels
+    return heightmap
+
+def load_image(image_path):
+    # Kept for existing callers; 16-bit and float images are no longer downcast
+    return np.asarray(open_heightmap(image_path))
+
+def _resample_rows(heightmap, rows, cols, order=3):
+    # Spline-sample heightmap at (rows x cols), reading only the rows needed
+    from scipy.ndimage import map_coordinates, spline_filter
+
+    first = max(int(np.floor(rows[0])) - SPLINE_HALO, 0)
+    last = min(int(np.ceil(rows[-1])) + SPLINE_HALO + 1, heightmap.shape[0])
+    window = np.asarray(heightmap[first:last], dtype=np.float64)
+    coefficients = spline_filter(window, order=order, mode='mirror') if order > 1 else window
+    # Coordinates are built per chunk, never for the whole output grid
+    row_coords = np.broadcast_to((rows - first)[:, None], (len(rows), len(cols)))
+    col_coords = np.broadcast_to(cols[None, :], (len(rows), len(cols)))
+    return map_coordinates(coefficients, [row_coords, col_coords], order=order, mode='mirror', prefilter=False)
+
+def _output_axes(shape, resolution_factor):
+    y = np.linspace(0, shape[0] - 1, max(int(shape[0] * resolution_factor), 1))
+    x = np.linspace(0, shape[1] - 1, max(int(shape[1] * resolution_factor), 1))
+    return y, x
+
+def _resample_tile(window, tile, heightmap, y, x, order):
+    # GridPool stage: output rows/cols of the tile, read from the shared source
+    row0, row1, col0, col1 = tile.bounds
+    return _resample_rows(heightmap, y[row0:row1], x[col0:col1], order)
+
+def resample_heightmap(heightmap, resolution_factor, chunk_rows=256, order=3, pool=None):
+    """
+    Resample a regular heightmap by resolution_factor with a cubic spline.
+
+    The output samples the same positions as
+    np.linspace(0, n - 1, int(n * resolution_factor)) along each axis. Output
+    rows are produced in chunks; each chunk only prefilters the input rows it
+    needs plus SPLINE_HALO rows of context, so memory stays proportional to
+    the chunk size and heightmap can be a memory-mapped array.
+
+    With a Controller.Gen.gridpool.GridPool the chunks run in its workers.
+    The source is copied into shared memory once for that, so pass a pool
+    only when the map fits in RAM.
+
+    Returns:
+    - A float64 array of shape (int(rows * f), int(cols * f)).
+    """
+    y, x = _output_axes(heightmap.shape, resolution_factor)
+    if pool is not None:
+        return pool.map_tiles(_resample_tile, shape=(len(y), len(x)), dtype=np.float64, tile_size=(chunk_rows, len(x)),
+                              heightmap=np.asarray(heightmap), y=y, x=x, order=order)
+    resampled = np.empty((len(y), len(x)), dtype=np.float64)
+    for start in range(0, len(y), chunk_rows):
+        rows = y[start:start + chunk_rows]
+        resampled[start:start + len(rows)] = _resample_rows(heightmap, rows, x, order)
+    return resampled
+
+def _apply_elevation(z, height_scale, height_offset, base_elevation, floor_elevation):
+    z = z * height_scale + height_offset + base_elevation
+    z = np.maximum(z, floor_elevation)
+    return np.power(z, 1.2)
+
+def create_mesh(heightmap, height_scale, height_offset, resolution_factor, base_elevation, floor_elevation):
+    import pyvista as pv
+
+    y, x = _output_axes(heightmap.shape, resolution_factor)
+    x_new, y_new = np.meshgrid(x, y)
+    z = resample_heightmap(heightmap, resolution_factor)
+
+    # Apply transformations
+    z = _apply_elevation(z, height_scale, height_offset, base_elevation, floor_elevation)
+
+    # Create the terrain mesh
+    grid = pv.StructuredGrid(x_new, y_new, z)
+    terrain_mesh = grid.extract_surface()
+
+    # Create a solid base layer
+    base_layer = pv.Plane(center=(np.mean(x_new), np.mean(y_new), floor_elevation),
+                          i_size=np.ptp(x_new), j_size=np.ptp(y_new),
+                          i_resolution=int(x_new.shape[1]), j_resolution=int(y_new.shape[0]))
+
+    return terrain_mesh, base_layer
+
+def iter_mesh_tiles(heightmap, height_scale, height_offset, resolution_factor, base_elevation, floor_elevation, tile_rows=512):
+    """
+    Stream a terrain mesh as bands of tile_rows output rows.
+
+    Same surface as create_mesh, but each band only reads the source rows it
+    needs, so heightmap can be a memory-mapped map far larger than RAM.
+    Consecutive bands share their boundary row, so they join without gaps.
+
+    Yields:
+    - (band_index, terrain_mesh) pairs.
+    """
+    import pyvista as pv
+
+    y, x = _output_axes(heightmap.shape, resolution_factor)
+    step = max(tile_rows - 1, 1)
+    for band_index, start in enumerate(range(0, max(len(y) - 1, 1), step)):
+        rows = y[start:start + tile_rows]
+        z = _resample_rows(heightmap, rows, x)
+        z = _apply_elevation(z, height_scale, height_offset, base_elevation, floor_elevation)
+        x_band, y_band = np.meshgrid(x, rows)
+        yield band_index, pv.StructuredGrid(x_band, y_band, z).extract_surface()
@@ -1,13 +1,35 @@
 #pip install numpy and noise and pillow and scipy
 import numpy as np
-from PIL import Image
-from noise import pnoise2, snoise2
-from scipy.spatial import Voronoi, voronoi_plot_2d
+from Controller.Gen.seeding import make_rng, legacy_seed
 
+# noise, Pillow and scipy are imported inside the functions that need them,
+# so importing this module stays cheap for worker processes.
 
 
 
-def generate_noise_image(width, height, scale, octaves, persistence, lacunarity, seed, noise_type):
+
+def _gradient_noise_block(row0, row1, col0, col1, width, height, scale, octaves, persistence, lacunarity, base, noise_type, on_row=None):
+    # Raw Perlin/Simplex values for rows row0:row1 and columns col0:col1 of the image
+    from noise import pnoise2, snoise2
+    block = np.zeros((row1 - row0, col1 - col0))
+    for i in range(row0, row1):
+        for j in range(col0, col1):
+            x, y = i / scale, j / scale
+            if noise_type == 'Perlin':
+                noise_value = pnoise2(x, y, octaves=octaves, persistence=persistence, lacunarity=lacunarity, repeatx=width, repeaty=height, base=base)
+            elif noise_type == 'Simplex':
+                noise_value = snoise2(x, y, octaves=octaves, persistence=persistence, lacunarity=lacunarity, base=base)
+            block[i - row0][j - col0] = noise_value
+        if on_row is not None:
+            on_row(i + 1 - row0, row1 - row0)
+    return block
+
+def _noise_tile(window, tile, **params):
+    # GridPool stage: every pixel only depends on its own coordinates
+    row0, row1, col0, col1 = tile.bounds
+    return _gradient_noise_block(row0, row1, col0, col1, **params)
+
+def generate_noise_image(width, height, scale, octaves, persistence, lacunarity, seed, noise_type, pool=None, on_row=None):
 # def generate_noise_image(width=500, height=500, scale=200, octaves=6, persistence=3, lacunarity=1, seed=1, noise_type='Perlin'):
     """
     Generate and save a 2D noise image with customizable variables.
@@ -17,8 +39,15 @@ def generate_noise_image(width, height, scale, octaves, persistence, lacunarity,
     - scale: Affects the "zoom" level of the noise.
     - octaves: Number of passes for generating noise, adds detail.
     - persistence, lacunarity: Affect the appearance of the noise.
-    - seed: Seed for the noise generation.
+    - seed: Master seed of the preset. Every noise type derives its own
+      stream from it, so the same seed always gives the same image.
     - noise_type: Type of the noise ('perlin', 'simplex', 'value', 'cellular').
+    - pool: Optional Controller.Gen.gridpool.GridPool. Perlin and Simplex
+      noise are then computed tile by tile in its workers; the image is
+      identical to the single-process one.
+    - on_row: Optional callable(rows_done, total_rows) called after each row
+      of single-process Perlin/Simplex noise, for progress reports. It may
+      raise to abort the generation.
 
     Returns:
     - A 2D numpy array of the generated noise.
@@ -26,19 +55,21 @@ def generate_noise_image(width, height, scale, octaves, persistence, lacunarity,
     noise_img = np.zeros((int(height), int(width)))
 
     if noise_type in ['Perlin', 'Simplex']:
-        for i in range(height):
-            for j in range(width):
-                x, y = i / scale, j / scale
-                if noise_type == 'Perlin':
-                    noise_value = pnoise2(x, y, octaves=octaves, persistence=persistence, lacunarity=lacunarity, repeatx=width, repeaty=height, base=seed)
-                elif noise_type == 'Simplex':
-                    noise_value = snoise2(x, y, octaves=octaves, persistence=persistence, lacunarity=lacunarity, base=seed)
-                noise_img[i][j] = noise_value
+        # pnoise2/snoise2 only take a small int base, derived from the master seed
+        base = legacy_seed(make_rng(seed, 'noise', 'base'))
+        params = dict(width=width, height=height, scale=scale, octaves=octaves, persistence=persistence,
+                      lacunarity=lacunarity, base=base, noise_type=noise_type)
+        if pool is not None:
+            noise_img = pool.map_tiles(_noise_tile, shape=(int(height), int(width)), dtype=np.float64, **params)
+        else:
+            noise_img = _gradient_noise_block(0, int(height), 0, int(width), on_row=on_row, **params)
     elif noise_type == 'Value':
-        np.random.seed(seed)
-        noise_img = np.random.rand(height, width)
+        rng = make_rng(seed, 'noise', 'value')
+        noise_img = rng.random((height, width))
     elif noise_type == 'Cellular':
-        points = np.random.rand(100, 2) * [width, height]
+        from scipy.spatial import Voronoi
+        rng = make_rng(seed, 'noise', 'cellular')
+        points = rng.random((100, 2)) * [width, height]
         vor = Voronoi(points)
         for i, (x, y) in enumerate(points):
             noise_img[int(y)][int(x)] = 1
@@ -47,6 +78,7 @@ def generate_noise_image(width, height, scale, octaves, persistence, lacunarity,
     return noise_img
 
 def save_image(image_array, file_name='noise_image.png'):
+    from PIL import Image
     img = Image.fromarray(image_array)
     img.save(file_name)
 
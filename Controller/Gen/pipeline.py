@@ -0,0 +1,238 @@
+import json
+import os
+import time
+
+import numpy as np
+
+from Controller.Gen.erosion import hydraulic_erosion, thermal_erosion
+from Controller.Gen.MeshGen import generate_dae_mesh
+from Controller.Gen.noisethingy import generate_noise_image, save_image
+from Controller.Gen.presets import enabled_objects, normalise_preset, preset_hash, preset_seed
+from Controller.Gen.seeding import make_rng
+from Controller.Gen.stamps import apply_stamps, volcano_stamps
+from Model.blobStore import store_generation
+
+MANIFEST_NAME = "manifest.json"
+
+# Objects placed per square unit of terrain at density 100
+OBJECTS_PER_AREA = 0.0005
+
+
+class GenerationCancelled(Exception):
+    """Raised by run_preset when its cancel event is set."""
+
+
+def heightmap_to_elevation(noise_img, preset):
+    """
+    Map an 8-bit noise image to terrain elevations.
+
+    0 maps to min_height and 255 to max_height, both raised by base_elevation.
+    """
+    low = float(preset["min_height"])
+    high = float(preset["max_height"])
+    return float(preset["base_elevation"]) + low + (high - low) * (noise_img.astype(float) / 255.0)
+
+
+def elevation_to_image(elevation, preset):
+    """
+    Map terrain elevations back to an 8-bit image, the inverse of
+    heightmap_to_elevation.
+
+    The range is widened to the elevation's own extremes when features or
+    erosion went past min_height/max_height, so nothing is clipped.
+    """
+    low = float(preset["base_elevation"]) + float(preset["min_height"])
+    high = float(preset["base_elevation"]) + float(preset["max_height"])
+    low, high = min(low, float(elevation.min())), max(high, float(elevation.max()))
+    scaled = (elevation - low) * (255.0 / (high - low)) if high > low else np.zeros_like(elevation)
+    return np.clip(np.rint(scaled), 0, 255).astype(np.uint8)
+
+
+def place_objects(preset, elevation, seed, kinds=None):
+    """
+    Scatter the enabled objects over the terrain.
+
+    Each object kind draws from its own seed stream, so toggling one kind
+    does not move the others. kinds optionally limits the placement to
+    some kinds; their positions are the same as in a full placement.
+
+    Returns:
+    - A dict of kind -> (N, 3) array of positions on the terrain surface.
+    """
+    size_y, size_x = elevation.shape
+    placements = {}
+    for kind, density in enabled_objects(preset):
+        if kinds is not None and kind not in kinds:
+            continue
+        rng = make_rng(seed, "objects", kind, "placement")
+        count = int(round(density / 100.0 * size_x * size_y * OBJECTS_PER_AREA))
+        x = rng.uniform(0, size_x - 1, count)
+        y = rng.uniform(0, size_y - 1, count)
+        z = elevation[y.astype(int), x.astype(int)]
+        placements[kind] = np.column_stack([x, y, z])
+    return placements
+
+
+def stamp_features(preset, elevation, seed):
+    """
+    Composite the terrain features of the enabled objects into elevation, in place.
+
+    Every volcano placement (see place_objects) gets a volcano stamp, so
+    volcano density drives how many there are; sizes come from their own
+    seed stream.
+
+    Returns:
+    - The list of applied stamps.
+    """
+    volcanoes = place_objects(preset, elevation, seed, kinds=("volcano",)).get("volcano")
+    if volcanoes is None:
+        return []
+    stamps = volcano_stamps(volcanoes, max(elevation.shape), make_rng(seed, "objects", "volcano", "shape"))
+    apply_stamps(elevation, stamps)
+    return stamps
+
+
+def is_complete(output_dir, digest):
+    # A job is done once its manifest has been written for the same preset hash
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return False
+    try:
+        with open(manifest_path, "r") as f:
+            return json.load(f).get("preset_hash") == digest
+    except (OSError, ValueError):
+        return False
+
+
+def write_manifest(output_dir, manifest):
+    with open(os.path.join(output_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def run_preset(preset_data, output_dir, progress=None, cancel=None, cache=None, store=None):
+    """
+    Run the full noise -> mesh -> objects -> export pipeline for one preset.
+
+    Parameters:
+    - preset_data: Preset dict in the format written by save_preset.
+    - output_dir: Directory for the job's files; created if missing.
+    - progress: Optional callable(stage, fraction) called as stages finish
+      and while the noise is generated.
+    - cancel: Optional threading.Event (anything with is_set()). It is
+      checked between stages and after every noise row; once set the run
+      stops with GenerationCancelled and no manifest is written.
+    - cache: Optional Controller.Gen.artifacts.ArtifactCache. A cached
+      preset is copied from it instead of generated; fresh results are
+      added to it.
+    - store: Optional Model.blobStore.ChunkStore. The final elevation and
+      terrain.dae are stored in it and the manifest's "artifacts" holds
+      their asset ids (for a parameter document's artifacts).
+
+    Returns:
+    - The manifest dict, which is also written to output_dir/manifest.json
+      as the last step. Its presence marks the job as complete.
+    """
+    preset = normalise_preset(preset_data)
+    digest = preset_hash(preset)
+    seed = preset_seed(preset)
+    os.makedirs(output_dir, exist_ok=True)
+    timings = {}
+
+    def check_cancelled():
+        if cancel is not None and cancel.is_set():
+            raise GenerationCancelled(output_dir)
+
+    def stage_done(stage, started, fraction):
+        timings[stage] = round(time.perf_counter() - started, 4)
+        if progress is not None:
+            progress(stage, fraction)
+        check_cancelled()
+
+    def noise_row_done(rows_done, total_rows):
+        check_cancelled()
+        if progress is not None:
+            progress("noise", 0.25 * rows_done / total_rows)
+
+    check_cancelled()
+    started = time.perf_counter()
+    cached = cache.get(preset) if cache is not None else None
+    if cached is not None:
+        cache.copy_to(cached, output_dir)
+        timings["cache"] = round(time.perf_counter() - started, 4)
+        manifest = {
+            "preset_hash": digest,
+            "seed": seed,
+            "preset": preset,
+            "files": cached["files"],
+            "timings": timings,
+            "cached": True,
+        }
+        if store is not None:
+            manifest["artifacts"] = store_generation(store, output_dir, cache.elevation(preset))
+        write_manifest(output_dir, manifest)
+        if progress is not None:
+            progress("cache", 1.0)
+        return manifest
+
+    noise_img = generate_noise_image(
+        int(preset["width"]),
+        int(preset["height"]),
+        int(preset["scale"]),
+        int(preset["octaves"]),
+        int(preset["persistence"]),
+        int(preset["lacunarity"]),
+        seed,
+        preset["noise_type"],
+        on_row=noise_row_done,
+    )
+    stage_done("noise", started, 0.25)
+
+    started = time.perf_counter()
+    elevation = heightmap_to_elevation(noise_img, preset)
+    stamp_features(preset, elevation, seed)
+    stage_done("features", started, 0.3)
+
+    started = time.perf_counter()
+    if int(preset["erosion_droplets"]) > 0:
+        hydraulic_erosion(elevation, int(preset["erosion_droplets"]), rng=make_rng(seed, "erosion", "hydraulic"))
+    if int(preset["thermal_iterations"]) > 0:
+        thermal_erosion(elevation, int(preset["thermal_iterations"]), talus=float(preset["thermal_talus"]), tolerance=1e-3)
+    # Saved from the final elevation, so it matches terrain.dae
+    save_image(elevation_to_image(elevation, preset), os.path.join(output_dir, "heightmap.png"))
+    stage_done("erosion", started, 0.4)
+
+    started = time.perf_counter()
+    placements = place_objects(preset, elevation, seed)
+    with open(os.path.join(output_dir, "objects.json"), "w") as f:
+        json.dump({kind: positions.tolist() for kind, positions in placements.items()}, f)
+    stage_done("objects", started, 0.5)
+
+    started = time.perf_counter()
+    generate_dae_mesh(
+        os.path.join(output_dir, "terrain.dae"),
+        size_x=elevation.shape[1] - 1,
+        size_y=elevation.shape[0] - 1,
+        min_vertices_x=preset["minVerticesX"],
+        max_vertices_x=max(preset["minVerticesX"], preset["maxVerticesX"]),
+        min_vertices_y=preset["minVerticesY"],
+        max_vertices_y=max(preset["minVerticesY"], preset["maxVerticesY"]),
+        rng=make_rng(seed, "mesh"),
+        heightmap=elevation,
+        smoothness=preset["smoothness"],
+        tree_positions=placements.get("trees", []),
+    )
+    stage_done("mesh", started, 1.0)
+
+    manifest = {
+        "preset_hash": digest,
+        "seed": seed,
+        "preset": preset,
+        "files": ["heightmap.png", "objects.json", "terrain.dae"],
+        "timings": timings,
+    }
+    if cache is not None:
+        cache.put(preset, output_dir, manifest["files"], elevation)
+    if store is not None:
+        manifest["artifacts"] = store_generation(store, output_dir, elevation)
+    write_manifest(output_dir, manifest)
+    return manifest
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+
+# Same keys and default values as the sliders in meshgenGUI.py, so presets
+# written by save_preset can be used without the GUI. Keys the GUI has no
+# slider for (erosion) default to off.
+DEFAULT_PRESET = {
+    "seed": None,
+    "noise_type": "Perlin",
+    "width": 500,
+    "height": 500,
+    "scale": 100,
+    "octaves": 5,
+    "persistence": 5,
+    "lacunarity": 5,
+    "resolution_factor": 5,
+    "base_elevation": 50,
+    "min_height": 500,
+    "max_height": 500,
+    "smoothness": 5,
+    "minVerticesX": 50,
+    "maxVerticesX": 50,
+    "minVerticesY": 50,
+    "maxVerticesY": 50,
+    "erosion_droplets": 0,
+    "thermal_iterations": 0,
+    "thermal_talus": 2.0,
+    "add_trees": "off",
+    "trees_density": 50,
+    "add_rocks": "off",
+    "rocks_density": 50,
+    "add_sticks": "off",
+    "sticks_density": 50,
+    "add_logs": "off",
+    "logs_density": 50,
+    "add_bushes": "off",
+    "bushes_density": 50,
+    "add_boulders": "off",
+    "boulders_density": 50,
+    "add_volcano": "off",
+    "volcano_density": 50,
+    "add_mushroom": "off",
+    "mushroom_density": 50,
+}
+
+# Keys added after presets were first hashed. They only count towards the
+# hash when changed from their default, so older presets keep their hash
+# and with it their derived seed and batch output directory.
+LATER_KEYS = ("erosion_droplets", "thermal_iterations", "thermal_talus")
+
+# Object kind -> (switch key, density key) in the preset
+OBJECT_KINDS = {
+    "trees": ("add_trees", "trees_density"),
+    "rocks": ("add_rocks", "rocks_density"),
+    "sticks": ("add_sticks", "sticks_density"),
+    "logs": ("add_logs", "logs_density"),
+    "bushes": ("add_bushes", "bushes_density"),
+    "boulders": ("add_boulders", "boulders_density"),
+    "volcano": ("add_volcano", "volcano_density"),
+    "mushroom": ("add_mushroom", "mushroom_density"),
+}
+
+
+def _normalise_value(value):
+    # CTk sliders return floats, so 500 and 500.0 must hash the same
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def normalise_preset(preset_data):
+    """
+    Fill in missing keys with the GUI defaults and normalise numbers.
+
+    Unknown keys are kept, so presets from newer versions still load.
+    Also accepts a Model.parameters.ParameterRecord.
+    """
+    if hasattr(preset_data, "to_preset"):
+        preset_data = preset_data.to_preset()
+    preset = dict(DEFAULT_PRESET)
+    preset.update(preset_data)
+    return {key: _normalise_value(value) for key, value in preset.items()}
+
+
+def load_preset(file_path):
+    with open(file_path, "r") as f:
+        return normalise_preset(json.load(f))
+
+
+def preset_name(file_path):
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+
+def canonical_json(preset_data):
+    preset = normalise_preset(preset_data)
+    for key in LATER_KEYS:
+        if preset[key] == _normalise_value(DEFAULT_PRESET[key]):
+            del preset[key]
+    return json.dumps(preset, sort_keys=True, separators=(",", ":"))
+
+
+def preset_hash(preset_data):
+    """
+    Return a stable hex digest of the preset.
+
+    Two presets that only differ in key order or int/float formatting of
+    slider values get the same hash. LATER_KEYS left at their defaults
+    don't change it.
+    """
+    return hashlib.sha256(canonical_json(preset_data).encode("utf-8")).hexdigest()
+
+
+def preset_seed(preset_data):
+    """
+    Return the master seed of a preset.
+
+    Presets saved before seeds existed get a seed derived from their hash,
+    so they still generate the same terrain on every run.
+    """
+    seed = preset_data.get("seed")
+    if seed is None:
+        return int(preset_hash(preset_data)[:8], 16)
+    return int(seed)
+
+
+def enabled_objects(preset_data):
+    # Yield (kind, density) for every object switch that is on
+    for kind, (switch_key, density_key) in OBJECT_KINDS.items():
+        if preset_data.get(switch_key) == "on":
+            yield kind, float(preset_data.get(density_key, 0))
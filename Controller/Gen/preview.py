@@ -0,0 +1,100 @@
+from functools import lru_cache
+import numpy as np
+
+from Controller.Gen.noisethingy import generate_noise_image
+from Controller.Gen.pipeline import GenerationCancelled, heightmap_to_elevation
+from Controller.Gen.presets import normalise_preset, preset_seed
+from Controller.Gen.seeding import legacy_seed, make_rng
+
+# Long edge of the preview passes: the first is drawn right away, the
+# others refine it in the background
+PREVIEW_SIZES = (64, 128, 256)
+
+
+@lru_cache(maxsize=128)
+def _octave_layer(noise_type, base, scale, width, height, frequency, rows, cols):
+    # One octave of Perlin/Simplex noise sampled on a rows x cols preview grid.
+    # Same call the noise library makes per octave, so summing layers gives
+    # the full image's noise, only at a lower resolution. Cached arrays are
+    # shared, callers must not modify them.
+    from noise import pnoise2, snoise2
+    layer = np.empty((rows, cols))
+    image_rows = np.linspace(0, height - 1, rows)
+    image_cols = np.linspace(0, width - 1, cols)
+    for r, i in enumerate(image_rows):
+        for c, j in enumerate(image_cols):
+            x, y = i / scale * frequency, j / scale * frequency
+            if noise_type == 'Perlin':
+                layer[r, c] = pnoise2(x, y, repeatx=int(width * frequency), repeaty=int(height * frequency), base=base)
+            else:
+                layer[r, c] = snoise2(x, y, base=base)
+    return layer
+
+
+def preview_shape(preset, size):
+    # Preview rows and columns with the preset's aspect ratio
+    width, height = int(preset["width"]), int(preset["height"])
+    longest = max(width, height)
+    return max(int(round(size * height / longest)), 2), max(int(round(size * width / longest)), 2)
+
+
+def preview_noise(preset_data, size, cancel=None):
+    """
+    Noise of a preset at preview resolution, scaled to 0-255.
+
+    Perlin and Simplex noise are built from cached per-octave layers, so
+    changing persistence, octaves or the height sliders only re-weights
+    layers that already exist. Value and Cellular noise are cheap and are
+    generated at full size and subsampled.
+    """
+    preset = normalise_preset(preset_data)
+    seed = preset_seed(preset)
+    rows, cols = preview_shape(preset, size)
+    width, height = int(preset["width"]), int(preset["height"])
+    noise_type = preset["noise_type"]
+
+    if noise_type not in ('Perlin', 'Simplex'):
+        full = generate_noise_image(width, height, int(preset["scale"]), int(preset["octaves"]),
+                                    int(preset["persistence"]), int(preset["lacunarity"]), seed, noise_type)
+        return full[np.linspace(0, height - 1, rows).astype(int)][:, np.linspace(0, width - 1, cols).astype(int)].astype(float)
+
+    # Same base and parameter rounding as generate_noise_image
+    base = legacy_seed(make_rng(seed, 'noise', 'base'))
+    persistence = int(preset["persistence"])
+    lacunarity = int(preset["lacunarity"])
+    total = np.zeros((rows, cols))
+    for octave in range(int(preset["octaves"])):
+        if cancel is not None and cancel.is_set():
+            raise GenerationCancelled("preview")
+        layer = _octave_layer(noise_type, base, int(preset["scale"]), width, height,
+                              float(lacunarity ** octave), rows, cols)
+        total += layer * persistence ** octave
+    return np.interp(total, (total.min(), total.max()), (0, 255))
+
+
+def hillshade(elevation, cell_size=1.0, azimuth=315.0, altitude=45.0):
+    """
+    Shaded relief of an elevation grid as a uint8 image.
+
+    azimuth and altitude give the light direction in degrees.
+    """
+    grad_y, grad_x = np.gradient(elevation, cell_size)
+    slope = np.pi / 2 - np.arctan(np.hypot(grad_x, grad_y))
+    aspect = np.arctan2(-grad_x, grad_y)
+    azimuth = np.radians(azimuth)
+    altitude = np.radians(altitude)
+    shaded = np.sin(altitude) * np.sin(slope) + np.cos(altitude) * np.cos(slope) * np.cos(azimuth - aspect)
+    return (np.clip(shaded, 0, 1) * 255).astype(np.uint8)
+
+
+def render_preview(preset_data, size, cancel=None):
+    """
+    Hillshade preview of a preset with a long edge of size pixels.
+
+    Raises GenerationCancelled if cancel gets set while octaves are computed.
+    """
+    preset = normalise_preset(preset_data)
+    elevation = heightmap_to_elevation(preview_noise(preset, size, cancel), preset)
+    rows, cols = elevation.shape
+    cell_size = max(int(preset["width"]) / float(cols), int(preset["height"]) / float(rows))
+    return hillshade(elevation, cell_size)
@@ -0,0 +1,76 @@
+import zlib
+import numpy as np
+
+
+def new_master_seed():
+    """
+    Draw a fresh master seed from OS entropy.
+
+    The value fits in a JSON number, so it can be stored in a preset and
+    replayed later to get the exact same terrain.
+    """
+    return int(np.random.SeedSequence().generate_state(1, dtype=np.uint32)[0])
+
+
+def _key_to_int(key):
+    # Names are hashed with crc32 so that the same name always maps to the
+    # same spawn key, independent of PYTHONHASHSEED or the order of calls.
+    if isinstance(key, (int, np.integer)):
+        return int(key)
+    return zlib.crc32(str(key).encode("utf-8"))
+
+
+def seed_sequence(master_seed, *keys):
+    """
+    Build the SeedSequence for one stream of a preset.
+
+    Parameters:
+    - master_seed: The preset's master seed.
+    - keys: Path identifying the stream, e.g. ('noise',), ('objects', 'trees')
+      or ('tile', row, col). Strings and non-negative ints can be mixed.
+
+    Returns:
+    - A numpy SeedSequence that only depends on master_seed and keys.
+    """
+    return np.random.SeedSequence(int(master_seed), spawn_key=tuple(_key_to_int(k) for k in keys))
+
+
+def make_rng(master_seed, *keys):
+    """
+    Return an independent numpy Generator for the stream named by keys.
+
+    Two calls with the same arguments always produce identical streams, and
+    streams with different keys are statistically independent. This is what
+    makes tiled and multi-process runs bit-identical to single-process ones:
+    a tile's stream depends on its coordinates, not on which worker runs it.
+    """
+    return np.random.Generator(np.random.PCG64(seed_sequence(master_seed, *keys)))
+
+
+def spawn_rngs(master_seed, count, *keys):
+    """
+    Return count independent Generators below the stream named by keys.
+
+    Useful for per-instance streams, e.g. one Generator per placed bush.
+    """
+    return [make_rng(master_seed, *keys, i) for i in range(int(count))]
+
+
+def as_rng(rng=None):
+    """
+    Normalise an rng argument.
+
+    Accepts an existing Generator, an int seed, or None (fresh entropy), so
+    generator functions can take a single optional rng parameter.
+    """
+    if isinstance(rng, np.random.Generator):
+        return rng
+    return np.random.default_rng(rng)
+
+
+def legacy_seed(rng, high=256):
+    """
+    Draw an integer seed for libraries that only take small int seeds,
+    such as the `base` argument of noise.pnoise2.
+    """
+    return int(rng.integers(0, high))
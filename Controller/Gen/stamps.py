@@ -0,0 +1,169 @@
+import numpy as np
+from collections import namedtuple
+from Controller.Gen.seeding import as_rng
+
+# One feature to composite into a heightmap, centred on (x, y) in cells.
+# - radius: Extent in cells; the stamp changes nothing further out (for
+#   ridges: the half width around the crest line).
+# - height: Height of the feature, negative to dig.
+# - blend: 'max', 'add' or 'smooth_min'; None uses the kind's default.
+# - angle, length: Direction (radians) and crest length of ridges.
+# - shape: Kind-specific fraction, None for the kind's default (see STAMP_KINDS).
+# - base: Level the feature stands on for 'max' and 'smooth_min'; None uses
+#   the lowest (max) or highest (smooth_min) height inside the stamp, so it
+#   blends into the terrain at its edge.
+# - smoothness: Blend width of 'smooth_min'; None uses 10% of |height|.
+Stamp = namedtuple(
+    "Stamp",
+    ["kind", "x", "y", "radius", "height", "blend", "angle", "length", "shape", "base", "smoothness"],
+    defaults=(None, 0.0, 0.0, None, None, None),
+)
+
+BLEND_MODES = ("max", "add", "smooth_min")
+
+
+def _smoothstep(t):
+    t = np.clip(t, 0, 1)
+    return t * t * (3 - 2 * t)
+
+
+def _volcano(u, crater):
+    # Concave cone up to the crater rim, then a bowl sunk to half the height
+    cone = ((1 - u) / (1 - crater)) ** 1.5
+    bowl = 0.5 + 0.5 * (u / crater) ** 2
+    return np.where(u < crater, bowl, cone)
+
+
+def _crater(u, rim):
+    # Bowl from -1 up to a raised rim at 1 - rim, then falling off to 0
+    inner = 1 - rim
+    bowl = -1 + (1 + 0.25) * (u / inner) ** 2
+    falloff = 0.25 * (1 - _smoothstep((u - inner) / rim))
+    return np.where(u < inner, bowl, falloff)
+
+
+def _plateau(u, top):
+    # Flat top out to top, then a smooth slope
+    return 1 - _smoothstep((u - top) / (1 - top))
+
+
+def _ridge(u, sharpness):
+    # Crest along the ridge line; higher sharpness gives steeper flanks
+    return (1 - u) ** (1 + sharpness)
+
+
+# Profile of each kind as a function of the normalised distance u (0 at the
+# centre or crest, 1 at the edge), its default shape fraction and blend mode
+STAMP_KINDS = {
+    "volcano": {"profile": _volcano, "shape": 0.2, "blend": "max"},
+    "crater": {"profile": _crater, "shape": 0.3, "blend": "add"},
+    "plateau": {"profile": _plateau, "shape": 0.6, "blend": "max"},
+    "ridge": {"profile": _ridge, "shape": 0.5, "blend": "max"},
+}
+
+
+def stamp_window(stamp, shape):
+    # Rows and columns (as slices) of the heightmap the stamp can change, or None if it misses the map
+    reach = stamp.radius
+    if stamp.kind == "ridge":
+        half = stamp.length / 2
+        reach_x = abs(np.cos(stamp.angle)) * half + stamp.radius
+        reach_y = abs(np.sin(stamp.angle)) * half + stamp.radius
+    else:
+        reach_x = reach_y = reach
+    row0, row1 = max(int(np.floor(stamp.y - reach_y)), 0), min(int(np.ceil(stamp.y + reach_y)) + 1, shape[0])
+    col0, col1 = max(int(np.floor(stamp.x - reach_x)), 0), min(int(np.ceil(stamp.x + reach_x)) + 1, shape[1])
+    if row0 >= row1 or col0 >= col1:
+        return None
+    return slice(row0, row1), slice(col0, col1)
+
+
+def _distance(stamp, rows, cols):
+    # Distance of the window's cells to the stamp centre (or ridge crest), over its radius
+    y = np.arange(rows.start, rows.stop)[:, None] - stamp.y
+    x = np.arange(cols.start, cols.stop)[None, :] - stamp.x
+    if stamp.kind == "ridge":
+        cos, sin = np.cos(stamp.angle), np.sin(stamp.angle)
+        along = np.clip(x * cos + y * sin, -stamp.length / 2, stamp.length / 2)
+        x, y = x - along * cos, y - along * sin
+    return np.sqrt(x * x + y * y) / stamp.radius
+
+
+def smooth_min(a, b, smoothness):
+    # Polynomial smooth minimum: min(a, b), rounded where they are within smoothness
+    h = np.maximum(smoothness - np.abs(a - b), 0) / smoothness
+    return np.minimum(a, b) - h * h * smoothness / 4
+
+
+def apply_stamp(heightmap, stamp):
+    """
+    Composite one stamp into heightmap, in place.
+
+    Only the stamp's bounding window is evaluated, so the cost depends on
+    the stamp's size, not on the heightmap's.
+
+    Returns:
+    - The heightmap.
+    """
+    kind = STAMP_KINDS[stamp.kind]
+    blend = stamp.blend or kind["blend"]
+    if blend not in BLEND_MODES:
+        raise ValueError(f"Unknown blend mode {blend!r}, expected one of {', '.join(BLEND_MODES)}")
+    window = stamp_window(stamp, heightmap.shape)
+    if window is None or stamp.radius <= 0:
+        return heightmap
+
+    u = _distance(stamp, *window)
+    inside = u < 1
+    # The window can overlap the map with no cell centre inside the radius
+    if not inside.any():
+        return heightmap
+    region = heightmap[window]
+    shape = kind["shape"] if stamp.shape is None else stamp.shape
+    profile = np.where(inside, kind["profile"](np.minimum(u, 1), shape), 0) * stamp.height
+
+    if blend == "add":
+        region += profile
+    elif blend == "max":
+        base = region[inside].min() if stamp.base is None else stamp.base
+        np.maximum(region, np.where(inside, base + profile, region), out=region)
+    else:
+        base = region[inside].max() if stamp.base is None else stamp.base
+        smoothness = stamp.smoothness or 0.1 * abs(stamp.height) or 1e-9
+        region[inside] = smooth_min(region[inside], base + profile[inside], smoothness)
+    return heightmap
+
+
+def apply_stamps(heightmap, stamps):
+    # Composite stamps in order; later ones see the result of earlier ones
+    for stamp in stamps:
+        apply_stamp(heightmap, stamp)
+    return heightmap
+
+
+def volcano_stamps(positions, map_size, rng=None, radius=(0.03, 0.08), height=(0.3, 0.6)):
+    """
+    Random volcano stamps at the given positions.
+
+    Parameters:
+    - positions: (N, 2+) array of x, y in cells (e.g. from
+      pipeline.place_objects).
+    - map_size: Larger side of the heightmap in cells.
+    - rng: numpy Generator or seed.
+    - radius: Range of the base radius, relative to map_size.
+    - height: Range of the height, relative to the radius.
+
+    Returns:
+    - A list of Stamp.
+    """
+    rng = as_rng(rng)
+    positions = np.asarray(positions, dtype=float)
+    if positions.size == 0:
+        return []
+    radii = rng.uniform(radius[0], radius[1], len(positions)) * map_size
+    heights = rng.uniform(height[0], height[1], len(positions)) * radii
+    craters = rng.uniform(0.1, 0.3, len(positions))
+    return [
+        Stamp("volcano", float(x), float(y), float(r), float(h), shape=float(c))
+        for (x, y), r, h, c in zip(positions[:, :2], radii, heights, craters)
+    ]
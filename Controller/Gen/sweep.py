@@ -0,0 +1,181 @@
+import itertools
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from Controller.Gen.artifacts import ArtifactCache
+from Controller.Gen.pipeline import run_preset
+from Controller.Gen.presets import DEFAULT_PRESET, normalise_preset, preset_hash, preset_seed
+
+INDEX_NAME = "index.json"
+CONTACT_SHEET_NAME = "contact_sheet.png"
+SWEEP_CACHE_DIR = ".cache"
+
+
+def parse_values(text):
+    """
+    Parse the values of one swept parameter.
+
+    Accepts a comma separated list ("1,2,4") or an inclusive range with an
+    optional step ("1:8" or "0.5:2:0.5"). Numbers stay ints where possible.
+    """
+    def number(part):
+        value = float(part)
+        return int(value) if value.is_integer() else value
+
+    def value(part):
+        # Non-numeric values, e.g. noise types, are kept as strings
+        try:
+            return number(part)
+        except ValueError:
+            return part.strip()
+
+    if ":" not in text:
+        return [value(part) for part in text.split(",")]
+    parts = [float(part) for part in text.split(":")]
+    if len(parts) not in (2, 3) or (len(parts) == 3 and parts[2] <= 0):
+        raise ValueError(f"Invalid range {text!r}, expected start:stop[:step]")
+    start, stop = parts[:2]
+    step = parts[2] if len(parts) == 3 else 1.0
+    count = int(math.floor((stop - start) / step + 1e-9)) + 1
+    return [number(round(start + i * step, 10)) for i in range(max(count, 0))]
+
+
+def expand_sweep(base_preset, ranges):
+    """
+    Expand parameter ranges into one preset per combination.
+
+    Parameters:
+    - base_preset: Preset dict the swept values are applied to.
+    - ranges: Dict of preset key -> list of values.
+
+    Returns:
+    - A list of normalised presets, in itertools.product order.
+
+    The base preset's seed is pinned first, so every variant gets the same
+    terrain seed and only differs in the swept parameters.
+    """
+    unknown = [key for key in ranges if key not in DEFAULT_PRESET]
+    if unknown:
+        raise ValueError(f"Unknown preset keys: {', '.join(unknown)}")
+    base = normalise_preset(base_preset)
+    base["seed"] = preset_seed(base)
+    keys = list(ranges)
+    return [normalise_preset(dict(base, **dict(zip(keys, values))))
+            for values in itertools.product(*(ranges[key] for key in keys))]
+
+
+def dedupe_presets(presets):
+    # Keep the first preset of every canonical hash, in order
+    unique = {}
+    for preset in presets:
+        unique.setdefault(preset_hash(preset), preset)
+    return list(unique.items())
+
+
+def run_sweep_job(preset, output_dir, cache_dir):
+    # Worker process: generate (or copy from the sweep cache) one variant
+    started = time.perf_counter()
+    manifest = run_preset(preset, output_dir, cache=ArtifactCache(cache_dir, max_bytes=None))
+    return time.perf_counter() - started, bool(manifest.get("cached"))
+
+
+def run_sweep(base_preset, ranges, output_root, jobs=None, progress=None, tile=128, columns=None):
+    """
+    Generate every combination of the swept parameters.
+
+    Duplicate combinations are generated once. Results are kept in an
+    artifact cache under output_root, so variants computed by an earlier
+    sweep into the same directory are copied instead of generated again.
+
+    Parameters:
+    - base_preset, ranges: See expand_sweep.
+    - output_root: Directory for the variants, the index and the contact sheet.
+    - jobs: Number of worker processes; defaults to the CPU count.
+    - progress: Optional callable(done, total, entry) called as variants finish.
+    - tile, columns: Contact sheet layout, see make_contact_sheet.
+
+    Returns:
+    - The index entries, one per unique variant, also written to
+      output_root/index.json.
+    """
+    presets = expand_sweep(base_preset, ranges)
+    unique = dedupe_presets(presets)
+    cache_dir = os.path.join(output_root, SWEEP_CACHE_DIR)
+    os.makedirs(output_root, exist_ok=True)
+
+    entries = {}
+    with ProcessPoolExecutor(max_workers=max(1, jobs or os.cpu_count() or 1)) as executor:
+        futures = {}
+        for digest, preset in unique:
+            output_dir = os.path.join(output_root, digest[:12])
+            futures[executor.submit(run_sweep_job, preset, output_dir, cache_dir)] = (digest, preset, output_dir)
+        for done, future in enumerate(as_completed(futures), start=1):
+            digest, preset, output_dir = futures[future]
+            entry = {
+                "hash": digest,
+                "dir": os.path.relpath(output_dir, output_root),
+                "params": {key: preset[key] for key in ranges},
+            }
+            try:
+                entry["seconds"], entry["cached"] = future.result()
+            except Exception as e:
+                entry["error"] = str(e)
+            entries[digest] = entry
+            if progress is not None:
+                progress(done, len(futures), entry)
+
+    # Index and contact sheet follow the sweep order, not completion order
+    index = [entries[digest] for digest, _ in unique]
+    sheet = make_contact_sheet(
+        [(preset, entries[digest]) for digest, preset in unique if "error" not in entries[digest]],
+        ArtifactCache(cache_dir, max_bytes=None),
+        tile=tile,
+        columns=columns,
+    )
+    if sheet is not None:
+        sheet.save(os.path.join(output_root, CONTACT_SHEET_NAME))
+    with open(os.path.join(output_root, INDEX_NAME), "w") as f:
+        json.dump({
+            "ranges": ranges,
+            "requested": len(presets),
+            "unique": len(unique),
+            "contact_sheet": CONTACT_SHEET_NAME if sheet is not None else None,
+            "variants": index,
+        }, f, indent=2)
+    return index
+
+
+def make_contact_sheet(variants, cache, tile=128, columns=None):
+    """
+    Lay out the thumbnails of finished variants on one image.
+
+    Every tile is captioned with the variant's swept parameters, and its
+    position is recorded in the entry as "sheet": [row, column].
+
+    Returns:
+    - A PIL image, or None if there is nothing to show.
+    """
+    from PIL import Image, ImageDraw
+
+    if not variants:
+        return None
+    columns = columns or int(math.ceil(math.sqrt(len(variants))))
+    rows = int(math.ceil(len(variants) / float(columns)))
+    caption_height = 14
+    sheet = Image.new("L", (columns * tile, rows * (tile + caption_height)), color=255)
+    draw = ImageDraw.Draw(sheet)
+    for position, (preset, entry) in enumerate(variants):
+        row, column = divmod(position, columns)
+        left, top = column * tile, row * (tile + caption_height)
+        thumbnail = cache.thumbnail(preset)
+        if thumbnail is not None:
+            image = Image.fromarray(thumbnail)
+            image.thumbnail((tile, tile))
+            sheet.paste(image, (left, top))
+        caption = " ".join(f"{key}={value}" for key, value in entry["params"].items())
+        draw.text((left + 2, top + tile), caption, fill=0)
+        entry["sheet"] = [row, column]
+    return sheet
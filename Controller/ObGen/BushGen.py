@@ -1,77 +1,300 @@
+import os
 import numpy as np
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D
-import random
-import matplotlib.tri as mtri
+from collections import OrderedDict, namedtuple
+from Controller.Gen.seeding import as_rng, make_rng
+from Controller.ObGen.shapes import (Mesh, direction_cells, icosphere, icosphere_cell_table,
+                                     smooth_vertex_values, subdivisions_for)
 
-def generate_bush_points(center, min_radius, max_radius, num_points, length, density, lumpiness):
+# matplotlib is only needed for the demo at the bottom, so workers can import
+# this module without it.
+
+# Many bushes in one flat buffer: the points of bush i are
+# points[offsets[i]:offsets[i + 1]], leaves first, then sticks.
+# kinds is LEAF or STICK per point.
+BushBatch = namedtuple("BushBatch", ["points", "offsets", "kinds"])
+LEAF = 0
+STICK = 1
+
+# Per-bush parameters of generate_bushes and the ranges random_bush_params draws them from
+BUSH_PARAM_RANGES = {
+    "min_radius": (0.5, 3),             # Minimum radius randomisation
+    "max_radius": (1.5, 3),             # Maximum radius randomisation
+    "num_points": (1000, 3000),         # Total points to generate before sparsity is applied
+    "length": (0.5, 3.0),               # Elongates the bush in the Y direction
+    "density": (0.4, 1),                # density randomiser
+    "lumpiness": (0.1, 0.5),            # Variation in radius to create lumps
+    "num_sticks": (5, 10),
+    "stick_length": (0.5, 1),
+    "stick_width": (5, 20),             # Points sampled along each stick
+}
+_INT_PARAMS = ("num_points", "num_sticks", "stick_width")
+
+# Leaf points generate_bushes computes at once
+BLOCK_POINTS = 1 << 14
+
+# Triangle budget of each level of detail, finest first. Bush clouds hold a
+# few thousand points, so finer hulls than this would mostly be guesswork.
+LOD_TRIANGLES = (320, 80, 20)
+# Bushes per worker task of bush_library; fixed so results don't depend on the worker count
+LIBRARY_CHUNK = 32
+# Libraries kept in memory by bush_library
+LIBRARY_CACHE_SIZE = 8
+_libraries = OrderedDict()
+
+
+def _bush_cloud(center, min_radius_cubed, max_radius_cubed, num_points, length, lumpiness, rng):
+    # Shared maths of generate_bush_points and generate_bushes; every argument
+    # is a scalar or an array with one entry per point. Radii come cubed so
+    # batches can compute them once per bush. Returns (num_points, 3) points.
     # Generate spherical coordinates
-    phi = np.random.uniform(0, 2 * np.pi, num_points)
-    costheta = np.random.uniform(-1, 1, num_points)
-    u = np.random.uniform(min_radius**3, max_radius**3, num_points)
-    
-    # Convert to cartesian coordinates
-    theta = np.arccos(costheta)
-    r = u**(1/3) * (1 + lumpiness * np.random.uniform(-0.5, 0.5, num_points)) 
-    x = r * np.sin(theta) * np.cos(phi) + center[0]
-    y = r * np.sin(theta) * np.sin(phi) + center[1] * length
-    z = r * np.cos(theta) + center[2]
-
-    # Density of the bush randomised through discarding points
-    mask = np.random.uniform(0, 1, num_points) < density
-    return x[mask], y[mask], z[mask]
-
-def generate_sticks(center, num_sticks, stick_length, max_radius, stick_width):
-    stick_points = []
-    for _ in range(num_sticks):
-        # Random position for each stick
-        stick_center = np.array([
-            np.random.uniform(center[0], max_radius / 2),
-            np.random.uniform(center[1], max_radius / 2),
-            np.random.uniform(center[2], max_radius / 2)
-        ])
-
-        # Random 3D orientation of sticks
-        orientation = np.random.normal(0, np.pi, 3)
-        for point in np.linspace(-stick_length / 2, stick_length / 2, int(stick_width)):
-            dx = np.sin(orientation[0]) * np.cos(orientation[1]) * point
-            dy = np.sin(orientation[0]) * np.sin(orientation[1]) * point
-            dz = np.cos(orientation[0]) * point
-            stick_points.append(stick_center + np.array([dx, dy, dz]))
-    
-    return np.array(stick_points).T
-
-
-# Parameters for bush
-center = [0, 0, 0]                               # Center of the bush
-min_radius = random.uniform(0.5, 3)              # Minimum radius randomisation
-max_radius = random.uniform(1.5, 3)              # Maximum radius randomisation
-num_points = random.randint(1000, 3000)          # Total points to generate before sparsity is applied
-length = random.uniform(0.5, 3.0)                # Elongates the bush in the Y direction
-density = random.uniform(0.4, 1)                 # density randomiser
-lumpiness = random.uniform(0.1, 0.5)             # Variation in radius to create lumps
-
-# Parameters for stick
-num_sticks = random.randint(5,10)
-stick_length = random.uniform (0.5,1)
-stick_width = random.randint(5, 20)
-
-# Generate Bush
-x, y, z = generate_bush_points(center, min_radius, max_radius, num_points, length, density, lumpiness)
-
-#Generate Stick
-sticks_x, sticks_y, sticks_z = generate_sticks(center, num_sticks, stick_length, stick_width, max_radius)
-
-# Combine Bush and Stick
-x = np.concatenate([x, sticks_x])
-y = np.concatenate([y, sticks_y])
-z = np.concatenate([z, sticks_z])
-
-# Visualization
-fig = plt.figure()
-ax = fig.add_subplot(111, projection='3d')
-ax.scatter(x, y, z, marker='o')
-ax.set_xlabel('X Label')
-ax.set_ylabel('Y Label')
-ax.set_zlabel('Z Label')
-plt.show()
+    phi = rng.uniform(0, 2 * np.pi, num_points)
+    costheta = rng.uniform(-1, 1, num_points)
+    # Written out rather than rng.uniform so min_radius > max_radius still works
+    u = min_radius_cubed + (max_radius_cubed - min_radius_cubed) * rng.random(num_points)
+
+    # Convert to cartesian coordinates; sin(arccos(c)) = sqrt(1 - c^2)
+    r = np.cbrt(u) * (1 + lumpiness * rng.uniform(-0.5, 0.5, num_points))
+    r_sin_theta = r * np.sqrt(1 - costheta * costheta)
+    points = np.empty((num_points, 3))
+    points[:, 0] = r_sin_theta * np.cos(phi) + center[..., 0]
+    points[:, 1] = r_sin_theta * np.sin(phi) * length + center[..., 1]
+    points[:, 2] = r * costheta + center[..., 2]
+    return points
+
+
+def generate_bush_points(center, min_radius, max_radius, num_points, length, density, lumpiness, rng=None):
+    rng = as_rng(rng)
+    # Density of the bush randomised through discarding points; every point
+    # is kept with probability density, so only the kept ones are generated
+    kept = rng.binomial(num_points, min(max(density, 0), 1))
+    points = _bush_cloud(np.asarray(center, dtype=float), min_radius**3, max_radius**3, kept,
+                         length, lumpiness, rng)
+    x, y, z = points.T
+    return x, y, z
+
+
+def _stick_cloud(center, stick_length, max_radius, samples, rng):
+    # One row per stick: random position within max_radius / 2 of the bush
+    # centre and random 3D orientation, then samples points along it.
+    # center, stick_length and max_radius are per stick.
+    num_sticks = len(center)
+    stick_center = center + rng.uniform(-0.5, 0.5, (num_sticks, 3)) * max_radius[:, None]
+    orientation = rng.normal(0, np.pi, (num_sticks, 3))
+    direction = np.column_stack([
+        np.sin(orientation[:, 0]) * np.cos(orientation[:, 1]),
+        np.sin(orientation[:, 0]) * np.sin(orientation[:, 1]),
+        np.cos(orientation[:, 0]),
+    ])
+
+    # Position of every sample along its stick, -length/2 .. length/2
+    stick = np.repeat(np.arange(num_sticks), samples)
+    first = np.cumsum(samples) - samples
+    step = np.arange(len(stick)) - first[stick]
+    along = (step / np.maximum(samples[stick] - 1, 1) - 0.5) * stick_length[stick]
+    return stick_center[stick] + direction[stick] * along[:, None], stick
+
+
+def generate_sticks(center, num_sticks, stick_length, max_radius, stick_width, rng=None):
+    rng = as_rng(rng)
+    samples = np.full(num_sticks, int(stick_width))
+    centers = np.broadcast_to(np.asarray(center, dtype=float), (num_sticks, 3))
+    points, _ = _stick_cloud(centers, np.full(num_sticks, float(stick_length)),
+                             np.full(num_sticks, float(max_radius)), samples, rng)
+    return points.T
+
+
+def random_bush_params(count, rng=None):
+    """
+    Draw parameters for count bushes from BUSH_PARAM_RANGES.
+
+    Returns:
+    - A dict of parameter -> array of length count, for generate_bushes.
+    """
+    rng = as_rng(rng)
+    params = {}
+    for name, (low, high) in BUSH_PARAM_RANGES.items():
+        if name in _INT_PARAMS:
+            params[name] = rng.integers(low, high, count, endpoint=True)
+        else:
+            params[name] = rng.uniform(low, high, count)
+    return params
+
+
+def generate_bushes(centers, params, rng=None, include_sticks=True):
+    """
+    Generate many bushes, sticks included, in one vectorized pass.
+
+    Parameters:
+    - centers: (N, 3) array of bush centres.
+    - params: Dict with the keys of BUSH_PARAM_RANGES; each value is a
+      scalar shared by all bushes or an array with one value per bush.
+      random_bush_params draws a full set.
+    - rng: numpy Generator or seed.
+    - include_sticks: Set to False for leaves only.
+
+    Returns:
+    - A BushBatch with one flat (M, 3) float array of points, the (N + 1,)
+      offsets of each bush in it and the kind of every point.
+    """
+    rng = as_rng(rng)
+    centers = np.atleast_2d(np.asarray(centers, dtype=float))
+    count = len(centers)
+    p = {name: np.broadcast_to(np.asarray(params[name]), (count,)) for name in BUSH_PARAM_RANGES}
+
+    # Points kept per bush after the density draw, as in generate_bush_points
+    leaf_counts = rng.binomial(p["num_points"].astype(int), np.clip(p["density"], 0, 1))
+    stick_counts = np.zeros(count, dtype=np.int64)
+    if include_sticks:
+        num_sticks = p["num_sticks"].astype(int)
+        stick_counts = num_sticks * p["stick_width"].astype(int)
+
+    # Layout of the batch: per bush its leaves, then its sticks
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(leaf_counts + stick_counts, out=offsets[1:])
+    kinds = np.repeat(np.tile(np.array([LEAF, STICK], dtype=np.uint8), count),
+                      np.column_stack([leaf_counts, stick_counts]).ravel())
+    leaves = kinds == LEAF
+    points = np.empty((offsets[-1], 3))
+
+    # Leaves: per-bush parameters repeated into per-point arrays, a block of
+    # bushes at a time so the temporaries stay in cache
+    min_cubed, max_cubed = p["min_radius"] ** 3, p["max_radius"] ** 3
+    leaf_ends = np.cumsum(leaf_counts)
+    start = 0
+    while start < count:
+        stop = max(int(np.searchsorted(leaf_ends, leaf_ends[start] - leaf_counts[start] + BLOCK_POINTS)), start + 1)
+        block, span = slice(start, stop), slice(offsets[start], offsets[stop])
+        repeats = leaf_counts[block]
+        points[span][leaves[span]] = _bush_cloud(
+            np.repeat(centers[block], repeats, axis=0),
+            np.repeat(min_cubed[block], repeats), np.repeat(max_cubed[block], repeats), int(repeats.sum()),
+            np.repeat(p["length"][block], repeats), np.repeat(p["lumpiness"][block], repeats), rng,
+        )
+        start = stop
+
+    if include_sticks:
+        samples = np.repeat(p["stick_width"].astype(int), num_sticks)
+        stick_points, _ = _stick_cloud(
+            np.repeat(centers, num_sticks, axis=0), np.repeat(p["stick_length"].astype(float), num_sticks),
+            np.repeat(p["max_radius"].astype(float), num_sticks), samples, rng,
+        )
+        points[~leaves] = stick_points
+    return BushBatch(points, offsets, kinds)
+
+
+def mesh_bushes(batch, centers, triangles=LOD_TRIANGLES, smoothing=2):
+    """
+    Turn bush point clouds into closed low-poly hulls.
+
+    Every hull is an icosphere whose vertices are pushed out to the leaves:
+    each leaf point is binned to its nearest icosphere direction, a vertex
+    takes the furthest extent of its bin along its direction, and the radii
+    are then smoothed over the sphere so single points don't make spikes.
+    Sticks are left out of the hull.
+
+    Parameters:
+    - batch: BushBatch from generate_bushes.
+    - centers: (N, 3) centres the batch was generated around.
+    - triangles: Triangle budget per level of detail; each level uses the
+      finest icosphere within its budget.
+    - smoothing: Smoothing passes over the radii.
+
+    Returns:
+    - One Mesh per budget. All bushes of a level share its faces, so its
+      vertices are (N, V, 3), relative to each bush's centre.
+    """
+    centers = np.atleast_2d(np.asarray(centers, dtype=float))
+    count = len(centers)
+    leaves = batch.kinds == LEAF
+    owner = np.repeat(np.arange(count), np.diff(batch.offsets))[leaves]
+    local = batch.points[leaves] - centers[owner]
+    # Direction of every leaf, shared by all levels
+    cells = direction_cells(local)
+
+    meshes = []
+    for budget in triangles:
+        sphere = icosphere(subdivisions_for(budget))
+        vertex_count = len(sphere.vertices)
+        bins = icosphere_cell_table(subdivisions_for(budget))[cells]
+        extent = np.einsum("ij,ij->i", local, sphere.vertices[bins])
+        radii = np.zeros(count * vertex_count)
+        np.maximum.at(radii, owner * vertex_count + bins, extent)
+        radii = radii.reshape(count, vertex_count)
+
+        # Directions without leaves start at the bush's mean radius
+        filled = radii > 0
+        mean = radii.sum(axis=1) / np.maximum(filled.sum(axis=1), 1)
+        radii = np.where(filled, radii, mean[:, None])
+        radii = smooth_vertex_values(radii, sphere.faces, smoothing)
+        meshes.append(Mesh(sphere.vertices * radii[:, :, None], sphere.faces))
+    return meshes
+
+
+def _library_chunk(seed, chunk, size, triangles):
+    # One worker task of bush_library: random bushes around the origin, meshed
+    rng = make_rng(seed, "bushes", "library", chunk)
+    centers = np.zeros((size, 3))
+    batch = generate_bushes(centers, random_bush_params(size, rng), rng, include_sticks=False)
+    return [mesh.vertices for mesh in mesh_bushes(batch, centers, triangles)]
+
+
+def bush_library(seed, count=16, triangles=LOD_TRIANGLES, jobs=1):
+    """
+    Meshed random bushes for a seed, to be placed by transform only.
+
+    Bushes are generated and meshed in chunks of LIBRARY_CHUNK, each from
+    its own seed stream, so the result is the same for any number of jobs.
+    The last LIBRARY_CACHE_SIZE libraries are kept in memory; asking again
+    for the same seed, count and budgets returns the cached meshes.
+
+    Parameters:
+    - seed: Master seed (see Controller.Gen.seeding).
+    - count: Number of bush variants.
+    - triangles: Triangle budget per level of detail, as in mesh_bushes.
+    - jobs: Worker processes; None uses the CPU count.
+
+    Returns:
+    - One read-only Mesh per budget, as in mesh_bushes, around the origin.
+    """
+    key = (int(seed), int(count), tuple(triangles))
+    if key in _libraries:
+        _libraries.move_to_end(key)
+        return _libraries[key]
+
+    sizes = [min(LIBRARY_CHUNK, count - start) for start in range(0, count, LIBRARY_CHUNK)]
+    tasks = [(key[0], chunk, size, key[2]) for chunk, size in enumerate(sizes)]
+    jobs = min(len(tasks), jobs or os.cpu_count() or 1)
+    if jobs > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(_library_chunk, *zip(*tasks)))
+    else:
+        results = [_library_chunk(*task) for task in tasks]
+
+    library = []
+    for level, budget in enumerate(key[2]):
+        vertices = np.concatenate([result[level] for result in results]) if results else np.zeros((0, 0, 3))
+        vertices.flags.writeable = False
+        library.append(Mesh(vertices, icosphere(subdivisions_for(budget)).faces))
+    _libraries[key] = library
+    while len(_libraries) > LIBRARY_CACHE_SIZE:
+        _libraries.popitem(last=False)
+    return library
+
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
+    # One random bush, shown as a point cloud
+    rng = as_rng()
+    bushes = generate_bushes([[0, 0, 0]], random_bush_params(1, rng), rng)
+    x, y, z = bushes.points.T
+
+    # Visualization
+    fig = plt.figure()
+    ax = fig.add_subplot(111, projection='3d')
+    ax.scatter(x, y, z, marker='o', c=bushes.kinds, cmap='summer')
+    ax.set_xlabel('X Label')
+    ax.set_ylabel('Y Label')
+    ax.set_zlabel('Z Label')
+    plt.show()
@@ -1,25 +1,141 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D
-from scipy.spatial import ConvexHull
-
-def rock_generator(num_points):
-    # more points mean smoother rocks
-    points = np.random.normal(size=(num_points, 3)) 
-    # Convex rock shape, so currently not indents or sheer caves etc.
-    hull = ConvexHull(points)
-    # Point cloud, can just be put into the mesh.
-    return(points,hull)
-
-# Currently exports to obj, but can just transfer point cloud to MESH
-""" def export_to_obj(rock, filename="rock_shape.obj"):
-    points = rock[0]
-    hull = rock[1]
-    with open(filename, "w") as file:
-        for point in points:
-            file.write(f"v {point[0]} {point[1]} {point[2]}\n")
-        for simplex in hull.simplices:
-            face_indices = [str(index + 1) for index in simplex]
-            file.write("f " + " ".join(face_indices) + "\n")
-            
-export_to_obj(rock_generator(10000)) """
\ No newline at end of file
+from collections import OrderedDict, namedtuple
+from Controller.Gen.seeding import as_rng, make_rng
+from Controller.ObGen.shapes import Mesh, icosphere, subdivisions_for
+
+# Placed copies of library rocks: position (N, 3), the library variant,
+# uniform scale and rotation about the Z axis of every instance
+RockInstances = namedtuple("RockInstances", ["positions", "variant", "scale", "yaw"])
+
+# Shape options of generate_rocks per object kind, plus the instance size range
+ROCK_KINDS = {
+    "rocks": {"roughness": 0.25, "dents": 1, "flat_base": 0.3, "size": (0.3, 1.0)},
+    "boulders": {"roughness": 0.35, "dents": 3, "flat_base": 0.2, "size": (1.5, 4.0)},
+}
+# Variants per library and the libraries kept in memory by rock_library
+LIBRARY_SIZE = 8
+LIBRARY_CACHE_SIZE = 8
+_libraries = OrderedDict()
+
+
+def rock_noise(directions, count, rng, octaves=3, frequency=1.5, persistence=0.5, waves=4):
+    """
+    Smooth random noise on the unit sphere for count variants at once.
+
+    Every octave sums a few plane waves with random directions and phases;
+    each octave doubles the frequency and scales the amplitude by
+    persistence. The result is roughly within [-1, 1].
+
+    Returns:
+    - (count, V) array, one value per variant and direction.
+    """
+    total = np.zeros((count, len(directions)))
+    amplitude, norm = 1.0, 0.0
+    for _ in range(int(octaves)):
+        wave = rng.normal(0, frequency, (count, waves, 3))
+        phase = rng.uniform(0, 2 * np.pi, (count, waves, 1))
+        total += amplitude * np.sin(wave @ directions.T + phase).sum(axis=1) / np.sqrt(waves)
+        norm += amplitude
+        amplitude *= persistence
+        frequency *= 2
+    return total / norm
+
+
+def generate_rocks(count, rng=None, max_vertices=642, roughness=0.25, octaves=3, frequency=1.5,
+                   dents=0, dent_depth=0.3, dent_width=0.6, squash=(0.6, 1.0), flat_base=0.0):
+    """
+    Generate rock meshes by displacing an icosphere.
+
+    Parameters:
+    - count: Number of rocks; they share one face array.
+    - rng: numpy Generator or seed.
+    - max_vertices: Vertex budget; the finest icosphere within it is used
+      (12, 42, 162, 642, 2562, ... vertices).
+    - roughness: Amplitude of the low-frequency noise relative to the radius.
+    - octaves, frequency: Noise detail, see rock_noise.
+    - dents: Concave hollows per rock, of dent_depth (relative to the
+      radius) and dent_width (angle in radians).
+    - squash: Range of the random scale of each axis.
+    - flat_base: 0..1, how much of the underside is cut flat.
+
+    Returns:
+    - A Mesh with (count, V, 3) vertices around the origin, roughly of
+      radius 1, and (F, 3) faces.
+    """
+    rng = as_rng(rng)
+    sphere = icosphere(subdivisions_for(2 * max(int(max_vertices), 12) - 4))
+    directions = sphere.vertices
+    radius = 1 + roughness * rock_noise(directions, count, rng, octaves, frequency)
+
+    # Hollows: a smooth falloff around random directions, subtracted from the radius
+    if dents > 0:
+        centre = rng.normal(size=(count, int(dents), 3))
+        centre /= np.linalg.norm(centre, axis=2, keepdims=True)
+        distance = (1 - centre @ directions.T) / (1 - np.cos(dent_width))
+        depth = dent_depth * rng.uniform(0.5, 1, (count, int(dents), 1))
+        radius -= (depth * np.clip(1 - distance, 0, 1) ** 2).sum(axis=1)
+
+    vertices = directions * np.maximum(radius, 0.05)[:, :, None]
+    vertices *= rng.uniform(squash[0], squash[1], (count, 1, 3))
+    if flat_base > 0:
+        bottom = vertices[:, :, 2].min(axis=1, keepdims=True)
+        vertices[:, :, 2] = np.maximum(vertices[:, :, 2], bottom * (1 - flat_base))
+    return Mesh(vertices, sphere.faces)
+
+
+def rock_generator(num_points, rng=None, **options):
+    # One rock with at most num_points vertices; options as in generate_rocks
+    rocks = generate_rocks(1, rng, max_vertices=num_points, **options)
+    return Mesh(rocks.vertices[0], rocks.faces)
+
+
+def rock_library(seed, kind="rocks", count=LIBRARY_SIZE, max_vertices=642):
+    """
+    The rock variants of a seed, generated once and then reused.
+
+    Variants come from their own seed stream per kind (see
+    Controller.Gen.seeding), so they don't change when other objects do.
+    The last LIBRARY_CACHE_SIZE libraries are kept in memory.
+
+    Returns:
+    - A read-only Mesh as from generate_rocks.
+    """
+    key = (int(seed), kind, int(count), int(max_vertices))
+    if key in _libraries:
+        _libraries.move_to_end(key)
+        return _libraries[key]
+    options = {name: value for name, value in ROCK_KINDS[kind].items() if name != "size"}
+    library = generate_rocks(count, make_rng(seed, "objects", kind, "library"), max_vertices, **options)
+    library.vertices.flags.writeable = False
+    _libraries[key] = library
+    while len(_libraries) > LIBRARY_CACHE_SIZE:
+        _libraries.popitem(last=False)
+    return library
+
+
+def place_rocks(library, positions, rng=None, size=(0.3, 1.0)):
+    # Pick a variant, scale and rotation for every position; no geometry is built
+    rng = as_rng(rng)
+    positions = np.atleast_2d(np.asarray(positions, dtype=float))
+    count = len(positions)
+    return RockInstances(
+        positions,
+        rng.integers(0, len(library.vertices), count),
+        rng.uniform(size[0], size[1], count),
+        rng.uniform(0, 2 * np.pi, count),
+    )
+
+
+def instance_vertices(library, instances):
+    """
+    World-space vertices of placed rocks, for exporters that can't
+    instance meshes.
+
+    Returns:
+    - (N, V, 3) array; every rock uses library.faces.
+    """
+    cos, sin = np.cos(instances.yaw), np.sin(instances.yaw)
+    local = library.vertices[instances.variant]
+    x, y, z = local[:, :, 0], local[:, :, 1], local[:, :, 2]
+    rotated = np.stack([cos[:, None] * x - sin[:, None] * y, sin[:, None] * x + cos[:, None] * y, z], axis=2)
+    return rotated * instances.scale[:, None, None] + instances.positions[:, None, :]
@@ -1,25 +1,18 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D
+from Controller.ObGen.shapes import lathe
 
-# Function to generate coordinates for a mushroom mesh
-def mushroom_mesh(radius=1, petal_width=0.2, num_petal_points=50, stem_height=2, stem_radius=0.1):
-    
-    theta = np.linspace(0, np.pi, num_petal_points)
-    phi = np.linspace(0, 2*np.pi, num_petal_points)
-    theta, phi = np.meshgrid(theta, phi)
-    
-    mushroom_x_petal = radius * np.sin(theta) * np.cos(phi)
-    mushroom_y_petal = radius * np.sin(theta) * np.sin(phi)
-    mushroom_z_petal = (radius * np.cos(theta)) + stem_height
-    
-    mushroom_stem_theta = np.linspace(0, 2*np.pi, num_petal_points)
-    mushroom_stem_z = np.linspace(0, stem_height, num_petal_points)
-    mushroom_stem_theta, stem_z = np.meshgrid(stem_theta, stem_z)
-    
-    mushroom_stem_x = stem_radius * np.cos(stem_theta)
-    mushroom_stem_y = stem_radius * np.sin(stem_theta)
-    mushroom_stem_z = stem_z
-    
-    return x_petal, y_petal, z_petal, stem_x, stem_y, stem_z
+# Function to generate a mushroom mesh: a stem with a domed cap on top
+def mushroom_mesh(radius=1, petal_width=0.2, num_petal_points=50, stem_height=2, stem_radius=0.1, sides=24):
+    # petal_width is the thickness of the cap's rim, num_petal_points the
+    # number of profile points along the dome
+    dome = np.linspace(0, np.pi / 2, num_petal_points)
+    cap_base = stem_height + petal_width
 
+    # Profile from the foot of the stem, up the stem, out under the cap, up
+    # the rim and over the dome to the top
+    profile_radius = np.concatenate([[stem_radius, stem_radius, radius], radius * np.cos(dome)])
+    profile_z = np.concatenate([[0, stem_height, stem_height], cap_base + radius * np.sin(dome)])
+    # Exactly on the axis, so the top becomes a single pole vertex
+    profile_radius[-1] = 0
+
+    return lathe(profile_radius, profile_z, sides)
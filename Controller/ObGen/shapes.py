@@ -0,0 +1,257 @@
+import numpy as np
+from collections import namedtuple
+from functools import lru_cache
+
+# Indexed triangle mesh. vertices is (V, 3), or (N, V, 3) for N meshes that
+# share one topology; faces is (F, 3) indices into the vertices, counter-
+# clockwise seen from outside.
+Mesh = namedtuple("Mesh", ["vertices", "faces"])
+
+# Cells per unit of cos(theta) / half turn of phi in the direction lookup
+# tables; fine enough for icospheres up to 4 subdivisions
+DIRECTION_RESOLUTION = 256
+
+_T = (1 + 5 ** 0.5) / 2
+_ICOSAHEDRON_VERTICES = [
+    (-1, _T, 0), (1, _T, 0), (-1, -_T, 0), (1, -_T, 0),
+    (0, -1, _T), (0, 1, _T), (0, -1, -_T), (0, 1, -_T),
+    (_T, 0, -1), (_T, 0, 1), (-_T, 0, -1), (-_T, 0, 1),
+]
+_ICOSAHEDRON_FACES = [
+    (0, 11, 5), (0, 5, 1), (0, 1, 7), (0, 7, 10), (0, 10, 11),
+    (1, 5, 9), (5, 11, 4), (11, 10, 2), (10, 7, 6), (7, 1, 8),
+    (3, 9, 4), (3, 4, 2), (3, 2, 6), (3, 6, 8), (3, 8, 9),
+    (4, 9, 5), (2, 4, 11), (6, 2, 10), (8, 6, 7), (9, 8, 1),
+]
+
+
+def _read_only(*arrays):
+    # Cached meshes are shared between callers, so guard them against edits
+    for array in arrays:
+        array.flags.writeable = False
+
+
+def edges(faces):
+    # Unique undirected edges of a triangle mesh, as (E, 2) with a < b
+    pairs = np.sort(faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+    return np.unique(pairs, axis=0)
+
+
+@lru_cache(maxsize=None)
+def icosphere(subdivisions):
+    """
+    Unit sphere made by subdividing an icosahedron.
+
+    Level k has 10 * 4^k + 2 vertices and 20 * 4^k faces. The vertices of
+    level k are the first vertices of level k + 1, so per-vertex values
+    fitted at a fine level can be cut down to a coarser one.
+
+    Returns:
+    - A read-only Mesh, shared by all callers.
+    """
+    if subdivisions == 0:
+        vertices = np.array(_ICOSAHEDRON_VERTICES, dtype=float)
+        vertices /= np.linalg.norm(vertices, axis=1, keepdims=True)
+        faces = np.array(_ICOSAHEDRON_FACES, dtype=np.int64)
+    else:
+        coarse = icosphere(subdivisions - 1)
+        count = len(coarse.vertices)
+        # One new vertex per edge, numbered after the existing ones
+        pairs = np.sort(coarse.faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+        keys, midpoint = np.unique(pairs[:, 0] * count + pairs[:, 1], return_inverse=True)
+        middle = coarse.vertices[keys // count] + coarse.vertices[keys % count]
+        middle /= np.linalg.norm(middle, axis=1, keepdims=True)
+        vertices = np.concatenate([coarse.vertices, middle])
+
+        # Every triangle becomes four: one per corner and the middle one
+        a, b, c = coarse.faces.T
+        ab, bc, ca = (midpoint.reshape(-1, 3) + count).T
+        faces = np.concatenate([
+            np.column_stack([a, ab, ca]),
+            np.column_stack([b, bc, ab]),
+            np.column_stack([c, ca, bc]),
+            np.column_stack([ab, bc, ca]),
+        ])
+    _read_only(vertices, faces)
+    return Mesh(vertices, faces)
+
+
+def subdivisions_for(triangles):
+    # Finest icosphere level with at most the given number of triangles (at least level 0)
+    level = 0
+    while 20 * 4 ** (level + 1) <= triangles:
+        level += 1
+    return level
+
+
+def direction_cells(points, resolution=DIRECTION_RESOLUTION):
+    """
+    Bucket the directions of points (seen from the origin) into the cells
+    of an equal-area (cos(theta), phi) grid.
+
+    Returns:
+    - An int array with one cell index per point, for the tables of
+      icosphere_cell_table.
+    """
+    points = np.asarray(points, dtype=float)
+    length = np.linalg.norm(points, axis=-1)
+    z = points[..., 2] / np.where(length > 0, length, 1)
+    row = np.minimum(((z + 1) * (resolution / 2)).astype(np.int64), resolution - 1)
+    phi = np.arctan2(points[..., 1], points[..., 0])
+    col = np.minimum(((phi + np.pi) * (resolution / np.pi)).astype(np.int64), 2 * resolution - 1)
+    return row * (2 * resolution) + col
+
+
+@lru_cache(maxsize=None)
+def icosphere_cell_table(subdivisions, resolution=DIRECTION_RESOLUTION):
+    # Nearest icosphere vertex of every direction_cells cell, so binning
+    # points by direction costs a lookup instead of a dot product per vertex
+    z = -1 + (np.arange(resolution) + 0.5) * (2 / resolution)
+    phi = -np.pi + (np.arange(2 * resolution) + 0.5) * (np.pi / resolution)
+    z, phi = np.meshgrid(z, phi, indexing="ij")
+    ring = np.sqrt(1 - z * z)
+    centres = np.column_stack([(ring * np.cos(phi)).ravel(), (ring * np.sin(phi)).ravel(), z.ravel()])
+    vertices = icosphere(subdivisions).vertices
+    table = np.concatenate([
+        np.argmax(block @ vertices.T, axis=1) for block in np.array_split(centres, max(1, len(vertices) // 16))
+    ])
+    _read_only(table)
+    return table
+
+
+def smooth_vertex_values(values, faces, iterations=1, weight=0.5):
+    """
+    Blend per-vertex values with the mean of their mesh neighbours.
+
+    Parameters:
+    - values: (..., V) array; leading axes are independent meshes with the
+      same faces.
+    - faces: (F, 3) faces.
+    - iterations: Number of passes.
+    - weight: Share of the neighbour mean in each pass.
+
+    Returns:
+    - The smoothed values, as a new array.
+    """
+    values = np.array(values, dtype=float)
+    count = values.shape[-1]
+    pairs = edges(faces)
+    pairs = np.concatenate([pairs, pairs[:, ::-1]])
+    pairs = pairs[np.argsort(pairs[:, 0], kind="stable")]
+    degree = np.bincount(pairs[:, 0], minlength=count)
+    # Neighbours padded to the highest degree; padding points at a dummy zero column
+    slot = np.arange(len(pairs)) - (np.cumsum(degree) - degree)[pairs[:, 0]]
+    table = np.full((count, max(int(degree.max(initial=0)), 1)), count)
+    table[pairs[:, 0], slot] = pairs[:, 1]
+    degree = np.maximum(degree, 1)
+    for _ in range(int(iterations)):
+        padded = np.concatenate([values, np.zeros(values.shape[:-1] + (1,))], axis=-1)
+        neighbour_mean = padded[..., table].sum(axis=-1) / degree
+        values = (1 - weight) * values + weight * neighbour_mean
+    return values
+
+
+def resample_profile(radius, z, samples):
+    """
+    Resample profile curves to samples points evenly spaced along their length.
+
+    Parameters:
+    - radius, z: (R,) profile, or (N, R) profiles resampled together.
+    - samples: Points in the result (at least 2).
+
+    Returns:
+    - radius, z with samples points per profile; the end points are kept.
+    """
+    single = np.ndim(radius) == 1
+    radius = np.atleast_2d(np.asarray(radius, dtype=float))
+    z = np.atleast_2d(np.asarray(z, dtype=float))
+    count, points = radius.shape
+    length = np.concatenate([
+        np.zeros((count, 1)), np.cumsum(np.hypot(np.diff(radius, axis=1), np.diff(z, axis=1)), axis=1),
+    ], axis=1)
+    position = length / np.where(length[:, -1:] > 0, length[:, -1:], 1)
+    # Interpolate all profiles in one pass: shift each row by its index so
+    # one searchsorted over the flattened rows finds every segment
+    target = np.linspace(0, 1, int(samples))
+    row = np.arange(count)[:, None]
+    segment = np.searchsorted((position + 2 * row).ravel(), (target + 2 * row).ravel(), side="right") - 1
+    segment = np.clip(segment.reshape(count, -1) - row * points, 0, points - 2)
+    start, end = np.take_along_axis(position, segment, 1), np.take_along_axis(position, segment + 1, 1)
+    weight = (target - start) / np.where(end > start, end - start, 1)
+
+    def interpolate(values):
+        low = np.take_along_axis(values, segment, 1)
+        return low + weight * (np.take_along_axis(values, segment + 1, 1) - low)
+    radius, z = interpolate(radius), interpolate(z)
+    return (radius[0], z[0]) if single else (radius, z)
+
+
+def lathe(radius, z, sides=24, caps=True, samples=None):
+    """
+    Mesh a surface of revolution around the Z axis.
+
+    The profile is a curve of (radius, z) points, ordered so the solid is
+    on the axis side when walking along it, e.g. from the bottom up along
+    the outside. Every profile point becomes a ring of sides vertices;
+    there is no duplicate seam column, and end points on the axis become a
+    single pole vertex. Open ends are closed with a flat cap when caps is
+    set.
+
+    Parameters:
+    - radius, z: (R,) profile, or (N, R) profiles that share one topology.
+    - sides: Vertices per ring.
+    - caps: Close ends that are off the axis.
+    - samples: Optional profile resolution; the profile is first resampled
+      to this many evenly spaced points (see resample_profile).
+
+    Returns:
+    - A Mesh with (V, 3) vertices, or (N, V, 3) for N profiles.
+    """
+    single = np.ndim(radius) == 1
+    radius = np.atleast_2d(np.asarray(radius, dtype=float))
+    z = np.atleast_2d(np.asarray(z, dtype=float))
+    if samples is not None:
+        radius, z = resample_profile(radius, z, samples)
+    count, points = radius.shape
+    sides = int(sides)
+
+    # Ends on the axis turn into poles; other ends get a cap centre if asked
+    start_pole = bool(np.all(radius[:, 0] == 0))
+    end_pole = bool(np.all(radius[:, -1] == 0))
+    first, last = int(start_pole), points - int(end_pole)
+    rings = last - first
+    angle = 2 * np.pi * np.arange(sides) / sides
+    ring_vertices = np.empty((count, rings, sides, 3))
+    ring_vertices[..., 0] = radius[:, first:last, None] * np.cos(angle)
+    ring_vertices[..., 1] = radius[:, first:last, None] * np.sin(angle)
+    ring_vertices[..., 2] = z[:, first:last, None]
+    vertices = [ring_vertices.reshape(count, rings * sides, 3)]
+
+    ring = np.arange(rings - 1)[:, None]
+    column = np.arange(sides)[None, :]
+    a = (ring * sides + column).ravel()
+    b = (ring * sides + (column + 1) % sides).ravel()
+    faces = [np.column_stack([a, b, b + sides]), np.column_stack([a, b + sides, a + sides])]
+
+    around = np.arange(sides)
+    following = (around + 1) % sides
+    next_vertex = rings * sides
+    if start_pole or caps:
+        vertices.append(np.column_stack([np.zeros((count, 2)), z[:, 0]])[:, None, :])
+        faces.append(np.column_stack([np.full(sides, next_vertex), following, around]))
+        next_vertex += 1
+    if end_pole or caps:
+        last_ring = (rings - 1) * sides
+        vertices.append(np.column_stack([np.zeros((count, 2)), z[:, -1]])[:, None, :])
+        faces.append(np.column_stack([last_ring + around, last_ring + following, np.full(sides, next_vertex)]))
+
+    vertices = np.concatenate(vertices, axis=1)
+    return Mesh(vertices[0] if single else vertices, np.concatenate(faces))
+
+
+def write_obj(mesh, path, offset=(0, 0, 0)):
+    # Export one mesh (vertices (V, 3)) as Wavefront OBJ, moved by offset
+    vertices = np.asarray(mesh.vertices, dtype=float) + np.asarray(offset, dtype=float)
+    with open(path, "w") as f:
+        np.savetxt(f, vertices, fmt="v %.6f %.6f %.6f")
+        np.savetxt(f, np.asarray(mesh.faces) + 1, fmt="f %d %d %d")
@@ -1,36 +1,119 @@
-import matplotlib.pyplot as plt
 import numpy as np
-from mpl_toolkits.mplot3d import Axes3D
-
-def random_tree():
-    # set minimum and maximum values for size of tree
-    trunk_height = np.random.uniform(2,4)
-    trunk_radius = np.random.uniform(0.1, 0.2)
-    
-    # Creating branches
-    branch_height = np.random.uniform(trunk_height + 1, trunk_height + 3)
-    branch_base = np.random.uniform(trunk_radius + 0.2, trunk_radius + 0.5)
-    branch_points = []
-    branch_angle = np.linspace(0, 2*np.pi)
-    for z in np.linspace(trunk_height, trunk_height + branch_height):
-        for angle in branch_angle:
-            radius = branch_base * (1 - z / (trunk_height + branch_height))
-            x = radius * np.cos(angle)
-            y = radius * np.sin(angle)
-            branch_points.append([x, y, z])
-
-    # Creating tree trunk
-    points = []
-    resolution = 100
-    tree_angle = np.linspace(0, 2*np.pi, resolution)
-    for z in np.linspace(0, trunk_height, resolution):
-        for angle in tree_angle:
-            x = trunk_radius * np.cos(angle)
-            y = trunk_radius * np.sin(angle)
-            points.append([x, y, z])
-    
-    
-    # Connect the trunk and the branch
-    tree = np.concatenate([branch_points, points], axis=0)
-    
-    return tree
+from collections import namedtuple
+from Controller.Gen.seeding import as_rng
+from Controller.ObGen.shapes import Mesh, lathe
+
+# One level of detail of a batch of trees: trunk and canopy are separate
+# meshes so they can get their own materials. Vertices are (N, V, 3) with
+# the base of every trunk at the origin; faces are shared by the batch.
+TreeMesh = namedtuple("TreeMesh", ["trunk", "canopy"])
+
+# Per-tree parameters of generate_trees and the ranges random_tree_params draws them from
+TREE_PARAM_RANGES = {
+    "trunk_height": (2, 4),
+    "trunk_radius": (0.1, 0.2),
+    "trunk_taper": (0.5, 0.8),          # Top radius relative to the base
+    "canopy_height": (1, 3),
+    "canopy_radius": (0.3, 0.7),        # Added to the trunk radius
+    "canopy_offset": (0.1, 0.3),        # How far the canopy reaches down the trunk, relative to its height
+}
+
+# Sides around the trunk and canopy per level of detail, finest first
+TREE_LOD_SIDES = (12, 6, 4)
+
+# Two crossed quads; texture coordinates of their vertices
+BILLBOARD_UV = np.array([[0, 0], [1, 0], [1, 1], [0, 1]] * 2, dtype=float)
+_BILLBOARD_FACES = np.array([[0, 1, 2], [0, 2, 3], [4, 5, 6], [4, 6, 7]])
+
+
+def random_tree_params(count, rng=None):
+    """
+    Draw parameters for count trees from TREE_PARAM_RANGES.
+
+    Returns:
+    - A dict of parameter -> array of length count, for generate_trees.
+    """
+    rng = as_rng(rng)
+    return {name: rng.uniform(low, high, count) for name, (low, high) in TREE_PARAM_RANGES.items()}
+
+
+def _profiles(params, canopy_layers):
+    # Trunk and canopy profiles (radius, z) of every tree, as (N, rings) arrays
+    p = {name: np.atleast_1d(np.asarray(params[name], dtype=float)) for name in TREE_PARAM_RANGES}
+    count = max(len(value) for value in p.values())
+    p = {name: np.broadcast_to(value, (count,)) for name, value in p.items()}
+
+    trunk_radius = np.column_stack([p["trunk_radius"], p["trunk_radius"] * p["trunk_taper"]])
+    trunk_z = np.column_stack([np.zeros(count), p["trunk_height"]])
+
+    # Stacked cones: each layer starts wide at s and narrows to half its
+    # width where the next one starts; the last one ends in the apex
+    bottom = p["trunk_height"] * (1 - p["canopy_offset"])
+    top = p["trunk_height"] + p["canopy_height"]
+    step = (top - bottom)[:, None] / (canopy_layers + 1)
+    layer = np.arange(canopy_layers)[None, :]
+    start = bottom[:, None] + step * layer
+    width = (p["trunk_radius"] + p["canopy_radius"])[:, None] * (1 - layer / (canopy_layers + 1))
+    canopy_radius = np.column_stack([
+        np.zeros(count), np.stack([width, width * 0.5], axis=2).reshape(count, -1)[:, :-1], np.zeros(count),
+    ])
+    canopy_z = np.column_stack([
+        bottom, np.stack([start, start + step], axis=2).reshape(count, -1)[:, :-1], top,
+    ])
+    return trunk_radius, trunk_z, canopy_radius, canopy_z
+
+
+def generate_trees(params, sides=TREE_LOD_SIDES, canopy_layers=1):
+    """
+    Build trunk and canopy meshes for a batch of trees.
+
+    The trunk is a tapered tube and the canopy one or more stacked cones,
+    closed underneath. Everything is computed with array operations over
+    the whole batch.
+
+    Parameters:
+    - params: Dict with the keys of TREE_PARAM_RANGES; each value is a
+      scalar or an array with one value per tree. random_tree_params draws
+      a full set.
+    - sides: Sides around the trunk and canopy, one entry per level of detail.
+    - canopy_layers: Number of stacked cones (1 for a plain cone).
+
+    Returns:
+    - One TreeMesh per entry of sides.
+    """
+    trunk_radius, trunk_z, canopy_radius, canopy_z = _profiles(params, int(canopy_layers))
+    levels = []
+    for count in sides:
+        # The canopy profile starts on the axis, so its underside closes itself
+        levels.append(TreeMesh(
+            lathe(trunk_radius, trunk_z, int(count), caps=False),
+            lathe(canopy_radius, canopy_z, int(count)),
+        ))
+    return levels
+
+
+def tree_billboards(params):
+    """
+    Impostors for distant trees: two crossed quads as wide as the canopy
+    and as tall as the tree, textured with BILLBOARD_UV.
+
+    Returns:
+    - A Mesh with (N, 8, 3) vertices and shared faces.
+    """
+    _, _, canopy_radius, canopy_z = _profiles(params, 1)
+    half = canopy_radius.max(axis=1)
+    height = canopy_z[:, -1]
+    corners = np.array([[-1, 0], [1, 0], [1, 1], [-1, 1]], dtype=float)
+    across, up = corners[:, 0] * half[:, None], corners[:, 1] * height[:, None]
+    zero = np.zeros_like(across)
+    vertices = np.concatenate([
+        np.stack([across, zero, up], axis=2),
+        np.stack([zero, across, up], axis=2),
+    ], axis=1)
+    return Mesh(vertices, _BILLBOARD_FACES)
+
+
+def random_tree(rng=None):
+    # One random tree at the finest level of detail
+    trunk, canopy = generate_trees(random_tree_params(1, rng), sides=TREE_LOD_SIDES[:1])[0]
+    return TreeMesh(Mesh(trunk.vertices[0], trunk.faces), Mesh(canopy.vertices[0], canopy.faces))
@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+import numpy as np
+
+# Byte chunks for files such as meshes; heightmaps are chunked by tile instead
+CHUNK_SIZE = 1024 * 1024
+HEIGHTMAP_TILE = 256
+
+
+def _digest(*parts):
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(part if isinstance(part, (bytes, bytearray, memoryview)) else str(part).encode('utf-8'))
+    return hasher.hexdigest()
+
+
+class ChunkStore:
+    """
+    Content-addressed storage for generated heightmaps and meshes.
+
+    Assets are split into chunks that are zlib-compressed and stored under
+    the sha256 of their raw bytes, so a chunk shared by several assets (or
+    an asset stored twice) takes space once. Each asset gets a small JSON
+    manifest, named after the hash of its whole content, listing its
+    chunks; that hash is the asset id documents refer to.
+
+    Heightmaps are chunked by 2D tile, so read_window only loads the tiles
+    a window touches. Files are chunked by CHUNK_SIZE bytes, so read_range
+    only loads the chunks a byte range touches.
+
+    Layout: root/chunks/ab/<hash> and root/assets/<id>.json
+    """
+
+    def __init__(self, root=os.path.join('GeneratedMeshes', '.blobs'), level=6):
+        self.root = root
+        self.level = level
+        self.stats = {'chunks_written': 0, 'chunks_reused': 0, 'bytes_written': 0}
+
+    def _chunk_path(self, digest):
+        return os.path.join(self.root, 'chunks', digest[:2], digest)
+
+    def _manifest_path(self, asset_id):
+        return os.path.join(self.root, 'assets', f'{asset_id}.json')
+
+    def _write_atomic(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # A unique temp file per call, so threads writing the same chunk don't share one
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def _put_chunk(self, data):
+        digest = _digest(data)
+        path = self._chunk_path(digest)
+        if os.path.exists(path):
+            self.stats['chunks_reused'] += 1
+        else:
+            compressed = zlib.compress(bytes(data), self.level)
+            self._write_atomic(path, compressed)
+            self.stats['chunks_written'] += 1
+            self.stats['bytes_written'] += len(compressed)
+        return digest
+
+    def _get_chunk(self, digest):
+        with open(self._chunk_path(digest), 'rb') as f:
+            return zlib.decompress(f.read())
+
+    def _put_manifest(self, asset_id, manifest):
+        path = self._manifest_path(asset_id)
+        if not os.path.exists(path):
+            self._write_atomic(path, json.dumps(manifest).encode('utf-8'))
+        return asset_id
+
+    def manifest(self, asset_id):
+        with open(self._manifest_path(asset_id), 'r') as f:
+            return json.load(f)
+
+    def exists(self, asset_id):
+        return os.path.exists(self._manifest_path(asset_id))
+
+    # Heightmaps
+
+    def put_heightmap(self, heightmap, tile=HEIGHTMAP_TILE):
+        """
+        Store a 2D array tile by tile.
+
+        Returns:
+        - The asset id. Storing the same array again returns the same id
+          without writing anything.
+        """
+        heightmap = np.ascontiguousarray(heightmap)
+        rows, cols = heightmap.shape
+        asset_id = _digest('heightmap', heightmap.dtype.str, heightmap.shape, tile, heightmap.data)
+        if self.exists(asset_id):
+            return asset_id
+        chunks = [
+            [self._put_chunk(np.ascontiguousarray(heightmap[r:r + tile, c:c + tile]).data) for c in range(0, cols, tile)]
+            for r in range(0, rows, tile)
+        ]
+        return self._put_manifest(asset_id, {
+            'kind': 'heightmap',
+            'dtype': heightmap.dtype.str,
+            'shape': [rows, cols],
+            'tile': tile,
+            'chunks': chunks,
+        })
+
+    def read_tile(self, asset_id, tile_row, tile_col, manifest=None):
+        manifest = manifest or self.manifest(asset_id)
+        rows, cols = manifest['shape']
+        tile = manifest['tile']
+        shape = (min(tile, rows - tile_row * tile), min(tile, cols - tile_col * tile))
+        data = self._get_chunk(manifest['chunks'][tile_row][tile_col])
+        return np.frombuffer(data, dtype=np.dtype(manifest['dtype'])).reshape(shape)
+
+    def read_window(self, asset_id, row0, row1, col0, col1):
+        # heightmap[row0:row1, col0:col1], decompressing only the tiles it overlaps
+        manifest = self.manifest(asset_id)
+        rows, cols = manifest['shape']
+        tile = manifest['tile']
+        row0, row1 = max(row0, 0), min(row1, rows)
+        col0, col1 = max(col0, 0), min(col1, cols)
+        window = np.empty((max(row1 - row0, 0), max(col1 - col0, 0)), dtype=np.dtype(manifest['dtype']))
+        for tile_row in range(row0 // tile, (row1 - 1) // tile + 1 if row1 > row0 else 0):
+            for tile_col in range(col0 // tile, (col1 - 1) // tile + 1 if col1 > col0 else 0):
+                block = self.read_tile(asset_id, tile_row, tile_col, manifest)
+                r0, c0 = tile_row * tile, tile_col * tile
+                br0, br1 = max(row0, r0), min(row1, r0 + block.shape[0])
+                bc0, bc1 = max(col0, c0), min(col1, c0 + block.shape[1])
+                window[br0 - row0:br1 - row0, bc0 - col0:bc1 - col0] = block[br0 - r0:br1 - r0, bc0 - c0:bc1 - c0]
+        return window
+
+    def read_heightmap(self, asset_id):
+        rows, cols = self.manifest(asset_id)['shape']
+        return self.read_window(asset_id, 0, rows, 0, cols)
+
+    # Files (meshes, images)
+
+    def put_bytes(self, data, kind='file', chunk_size=CHUNK_SIZE):
+        data = memoryview(data)
+        asset_id = _digest(kind, data)
+        if self.exists(asset_id):
+            return asset_id
+        chunks = [self._put_chunk(data[start:start + chunk_size]) for start in range(0, len(data), chunk_size)]
+        return self._put_manifest(asset_id, {
+            'kind': kind,
+            'size': len(data),
+            'chunk_size': chunk_size,
+            'chunks': chunks,
+        })
+
+    def put_file(self, path, kind='mesh', chunk_size=CHUNK_SIZE):
+        with open(path, 'rb') as f:
+            return self.put_bytes(f.read(), kind, chunk_size)
+
+    def read_range(self, asset_id, start, end=None):
+        # Bytes start:end of a file asset, decompressing only the chunks it overlaps
+        manifest = self.manifest(asset_id)
+        size, chunk_size = manifest['size'], manifest['chunk_size']
+        end = size if end is None else min(end, size)
+        if start >= end:
+            return b''
+        first, last = start // chunk_size, (end - 1) // chunk_size
+        data = b''.join(self._get_chunk(digest) for digest in manifest['chunks'][first:last + 1])
+        offset = first * chunk_size
+        return data[start - offset:end - offset]
+
+    def read_bytes(self, asset_id):
+        return self.read_range(asset_id, 0)
+
+    def export_file(self, asset_id, path):
+        with open(path, 'wb') as f:
+            for digest in self.manifest(asset_id)['chunks']:
+                f.write(self._get_chunk(digest))
+
+
+def store_generation(store, output_dir, elevation=None):
+    """
+    Store the artifacts of a pipeline run (see Controller/Gen/pipeline.py).
+
+    Parameters:
+    - store: A ChunkStore.
+    - output_dir: The run's output directory.
+    - elevation: Optional final elevation grid, stored as a tiled float32
+      heightmap like Controller.Gen.artifacts keeps it, so fresh and cached
+      runs of a preset share one asset. Without it the 8-bit heightmap.png
+      of the run is stored as a file.
+
+    Returns:
+    - A dict of artifact name -> asset id, to put in a parameter document
+      (see create_document_schema's artifacts argument).
+    """
+    artifacts = {}
+    if elevation is not None:
+        artifacts['heightmap'] = store.put_heightmap(np.asarray(elevation, dtype=np.float32))
+    elif os.path.exists(os.path.join(output_dir, 'heightmap.png')):
+        artifacts['heightmap'] = store.put_file(os.path.join(output_dir, 'heightmap.png'), kind='image')
+    mesh_path = os.path.join(output_dir, 'terrain.dae')
+    if os.path.exists(mesh_path):
+        artifacts['mesh'] = store.put_file(mesh_path, kind='mesh')
+    return artifacts
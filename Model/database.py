@@ -1,84 +1,489 @@
-from pymongo import UpdateOne
-from pymongo.mongo_client import MongoClient
-from pymongo.server_api import ServerApi
+from pymongo import ASCENDING, IndexModel, UpdateOne
+from pymongo.errors import BulkWriteError
 from bson import ObjectId
 from urllib.parse import quote_plus
-from motor.motor_asyncio import AsyncIOMotorClient
+from contextlib import asynccontextmanager
 import asyncio
-from documentSchema import create_document_schema
+import os
+import time
+from Model.documentSchema import create_document_schema
+from Model.parameters import ParameterRecord
 
 password = quote_plus('6hrfDLfQ5M2gs53M')
 username = quote_plus('mesh')
 
 uri = 'mongodb+srv://' + username + ':' + password + '@meshgen.jkozatf.mongodb.net/?retryWrites=true&w=majority&appName=MeshGen'
 
-# Create a new client and connect to the server
-client = AsyncIOMotorClient(uri)
+# Point the app at another deployment, e.g. a local mongod for testing
+uri = os.environ.get('MESHGEN_MONGO_URI', uri)
+
+# Storage backend: 'mongo' (the deployment above) or 'sqlite' (a local file,
+# no server needed), see open_repository
+BACKEND = os.environ.get('MESHGEN_DB_BACKEND', 'mongo')
+SQLITE_PATH = os.environ.get('MESHGEN_SQLITE_PATH', 'meshDB.sqlite3')
+
+# Seconds the shared repository caches find() results; 0 turns the cache off
+QUERY_CACHE_TTL = float(os.environ.get('MESHGEN_QUERY_CACHE_TTL', '30'))
+
+# Connection pool settings, passed straight to the Motor client
+POOL_DEFAULTS = {
+    'maxPoolSize': 50,
+    'minPoolSize': 0,
+    'maxIdleTimeMS': 60000,
+    'waitQueueTimeoutMS': 10000,
+    'connectTimeoutMS': 5000,
+    'serverSelectionTimeoutMS': 5000,
+    'socketTimeoutMS': 30000,
+}
+
+# Indexes on the fields presets are browsed and filtered by, see documentSchema
+INDEXES = [
+    IndexModel([('GenName', ASCENDING)], name='gen_name'),
+    IndexModel([('SizeX', ASCENDING), ('SizeY', ASCENDING)], name='size'),
+] + [
+    IndexModel([(field, ASCENDING)], name=field.lower())
+    for field in ('RockDen', 'BushDen', 'TreeDen', 'LogDen', 'StickDen', 'BoulderDen')
+]
+
+
+def _sort_spec(sort):
+    # [(field, direction)] with _id appended, so the order is total
+    if sort is None:
+        sort = []
+    elif isinstance(sort, str):
+        sort = [(sort, ASCENDING)]
+    # Keep the caller's _id direction, but always as the last key
+    id_direction = dict(sort).get('_id', ASCENDING)
+    return [(field, direction) for field, direction in sort if field != '_id'] + [('_id', id_direction)]
+
+
+def _after_filter(sort, after):
+    # Documents that come strictly after the key values in after, in sort order:
+    # (a > x) or (a == x and b > y) or ...
+    branches = []
+    for i, (field, direction) in enumerate(sort):
+        branch = {earlier: after[earlier] for earlier, _ in sort[:i]}
+        branch[field] = {'$gt' if direction == ASCENDING else '$lt': after[field]}
+        branches.append(branch)
+    return {'$or': branches}
+
+
+class MeshRepository:
+    """
+    Async access to the generation parameter collection.
+
+    One repository owns one Motor client, so every operation shares the
+    client's connection pool. The client is created on first use with the
+    pool settings in POOL_DEFAULTS, overridden by pool_options. Sessions
+    are kept in a small pool too: each operation checks one out and hands
+    it back, instead of starting a new session every time. Sessions are
+    never shared by two operations at once; at most maxPoolSize operations
+    run concurrently, the rest wait for a session.
+
+    For tests, pass uri='mongodb://localhost:27017' for a local mongod, or
+    client= any object with the AsyncIOMotorClient interface (e.g. a
+    mongomock-motor client) to run without a server.
+
+        async with MeshRepository() as repo:
+            document_id = await repo.insert(ParameterRecord.from_preset(preset_data, name))
+    """
+
+    def __init__(self, uri=uri, database_name='meshDB', collection_name='parameters', client=None, **pool_options):
+        self.uri = uri
+        self.database_name = database_name
+        self.collection_name = collection_name
+        self.pool_options = dict(POOL_DEFAULTS, **pool_options)
+        self._client = client
+        self._owns_client = client is None
+        self._idle_sessions = []
+        self._session_slots = asyncio.Semaphore(self.pool_options['maxPoolSize'])
+        self._indexes_ready = False
+
+    @property
+    def client(self):
+        if self._client is None:
+            from motor.motor_asyncio import AsyncIOMotorClient
+            self._client = AsyncIOMotorClient(self.uri, **self.pool_options)
+        return self._client
+
+    @property
+    def collection(self):
+        return self.client[self.database_name][self.collection_name]
+
+    async def __aenter__(self):
+        await self.ensure_indexes()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    @asynccontextmanager
+    async def session(self):
+        # Check out an idle session, or start one if all are in use
+        async with self._session_slots:
+            session = self._idle_sessions.pop() if self._idle_sessions else await self.client.start_session()
+            try:
+                yield session
+            finally:
+                if not getattr(session, 'has_ended', False):
+                    self._idle_sessions.append(session)
+
+    async def close(self):
+        # End the pooled sessions and, if this repository created it, the client
+        sessions, self._idle_sessions = self._idle_sessions, []
+        for session in sessions:
+            await session.end_session()
+        if self._client is not None and self._owns_client:
+            self._client.close()
+            self._client = None
+
+    async def ping(self):
+        await self.client.admin.command('ping')
+
+    async def ensure_indexes(self):
+        # Create INDEXES once per repository; a no-op on the server if they exist
+        if self._indexes_ready:
+            return
+        async with self.session() as session:
+            await self.collection.create_indexes(INDEXES, session=session)
+        self._indexes_ready = True
+
+    async def insert_document(self, document):
+        async with self.session() as session:
+            result = await self.collection.insert_one(document, session=session)
+        return result.inserted_id
+
+    async def insert_many(self, documents, ordered=False):
+        """
+        Insert a batch of documents in one round trip.
+
+        With ordered=False the server keeps going past failed documents; a
+        BulkWriteError is still raised afterwards, listing them.
+        """
+        async with self.session() as session:
+            result = await self.collection.insert_many(documents, ordered=ordered, session=session)
+        return result.inserted_ids
+
+    async def insert(self, *args):
+        # A ParameterRecord, or the positional arguments of create_document_schema
+        return await self.insert_document(create_document_schema(*args))
+
+    async def delete(self, document_ids):
+        async with self.session() as session:
+            result = await self.collection.delete_many(
+                {'_id': {'$in': [ObjectId(id) for id in document_ids]}}, session=session
+            )
+        return result.deleted_count
+
+    async def update(self, updates):
+        # updates: [{'documentId': ..., 'update_values': {...}}, ...]
+        operations = [
+            UpdateOne({'_id': ObjectId(update['documentId'])}, {'$set': update['update_values']})
+            for update in updates
+        ]
+        if not operations:
+            return None
+        async with self.session() as session:
+            result = await self.collection.bulk_write(operations, session=session)
+        return result.bulk_api_result
+
+    async def find(self, query, projection=None):
+        # Whole result as a list; use iter_find or find_page for large results
+        async with self.session() as session:
+            return await self.collection.find(query, projection, session=session).to_list(length=None)
+
+    async def iter_find(self, query=None, projection=None, sort=None, batch_size=500):
+        """
+        Stream matching documents without loading the whole result.
+
+        Parameters:
+        - query: Filter document; None matches everything.
+        - projection: Fields to return, e.g. {'GenName': 1, 'SizeX': 1}.
+        - sort: Field name or [(field, direction)] list.
+        - batch_size: Documents fetched per round trip.
+
+            async for document in repo.iter_find({'SizeX': 500}, {'GenName': 1}):
+                ...
+        """
+        async with self.session() as session:
+            cursor = self.collection.find(query or {}, projection, session=session).batch_size(batch_size)
+            if sort is not None:
+                cursor = cursor.sort(_sort_spec(sort))
+            async for document in cursor:
+                yield document
+
+    async def find_page(self, query=None, projection=None, sort=None, limit=100, after=None):
+        """
+        Fetch one page of results using keyset pagination.
+
+        Instead of skipping over earlier pages, each page starts right after
+        the last document of the previous one, so page N costs the same as
+        page 1 when the sort fields are indexed. _id is appended to the sort
+        to break ties.
+
+        Parameters:
+        - query, projection, sort: As for iter_find.
+        - limit: Page size.
+        - after: The token returned with the previous page, None for the first.
+
+        Returns:
+        - (documents, token). token is None on the last page.
+        """
+        sort = _sort_spec(sort)
+        query = dict(query or {})
+        if after is not None:
+            query = {'$and': [query, _after_filter(sort, after)]} if query else _after_filter(sort, after)
+        if projection is not None and any(projection.values()):
+            # The token is built from the sort fields, so they must be returned
+            projection = dict(projection, **{field: 1 for field, _ in sort})
+        async with self.session() as session:
+            cursor = self.collection.find(query, projection, session=session).sort(sort).limit(limit)
+            documents = await cursor.to_list(length=limit)
+        if len(documents) < limit:
+            return documents, None
+        return documents, {field: documents[-1].get(field) for field, _ in sort}
+
+
+# Queue item asking the writer to write what it has and report back
+_FLUSH = object()
+
+
+class WriteBehindQueue:
+    """
+    Buffers documents and writes them with insert_many(ordered=False).
+
+    A batch is written once batch_size documents are waiting or
+    flush_interval seconds after its first document arrived, whichever
+    comes first. put() waits while max_pending documents are queued, so
+    producers slow down instead of growing the buffer without bound.
+    close() (or leaving the async with block) writes everything that is
+    still queued.
+
+    Failed documents are counted, not retried; see stats().
+
+        async with WriteBehindQueue(repo) as queue:
+            for record in records:
+                await queue.put(record)
+    """
+
+    def __init__(self, repository, batch_size=500, flush_interval=1.0, max_pending=10000):
+        self.repository = repository
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = asyncio.Queue(maxsize=max_pending)
+        self._task = None
+        self.counters = {
+            'enqueued': 0,
+            'written': 0,
+            'failed': 0,
+            'batches': 0,
+            'max_batch': 0,
+            'write_seconds': 0.0,
+            'max_write_seconds': 0.0,
+            'wait_seconds': 0.0,
+            'max_wait_seconds': 0.0,
+        }
+        self.last_error = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def put(self, document):
+        # A document or ParameterRecord; waits while the queue is full (backpressure)
+        if isinstance(document, ParameterRecord):
+            document = document.to_document()
+        self.start()
+        await self._queue.put((time.perf_counter(), document))
+        self.counters['enqueued'] += 1
+
+    async def put_record(self, *args):
+        # A ParameterRecord, or the positional arguments of create_document_schema
+        await self.put(create_document_schema(*args))
+
+    async def flush(self):
+        # Return once everything queued before the call has been written
+        if self._task is None:
+            return
+        done = asyncio.get_running_loop().create_future()
+        await self._queue.put((_FLUSH, done))
+        await done
+
+    async def close(self):
+        if self._task is None:
+            return
+        await self.flush()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self):
+        # Counters plus derived averages, for logging or monitoring
+        stats = dict(self.counters, pending=self._queue.qsize())
+        batches = max(stats['batches'], 1)
+        stats['mean_batch'] = (stats['written'] + stats['failed']) / batches
+        stats['mean_write_seconds'] = stats['write_seconds'] / batches
+        stats['mean_wait_seconds'] = stats['wait_seconds'] / max(stats['written'] + stats['failed'], 1)
+        return stats
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        getter = None
+        try:
+            while True:
+                # One get() is kept pending across timeouts so no item is ever lost
+                getter = getter or loop.create_task(self._queue.get())
+                batch, waiters = [], []
+                deadline = None
+                while len(batch) < self.batch_size:
+                    timeout = None if deadline is None else max(deadline - loop.time(), 0)
+                    done, _ = await asyncio.wait({getter}, timeout=timeout)
+                    if not done:
+                        break
+                    enqueued_at, document = getter.result()
+                    getter = loop.create_task(self._queue.get())
+                    if enqueued_at is _FLUSH:
+                        waiters.append(document)
+                        break
+                    batch.append((enqueued_at, document))
+                    if deadline is None:
+                        deadline = loop.time() + self.flush_interval
+                if batch:
+                    await self._write(batch)
+                for waiter in waiters:
+                    waiter.set_result(None)
+        finally:
+            if getter is not None:
+                getter.cancel()
+
+    async def _write(self, batch):
+        counters = self.counters
+        started = time.perf_counter()
+        failed = 0
+        try:
+            await self.repository.insert_many([document for _, document in batch], ordered=False)
+        except BulkWriteError as e:
+            failed = len(e.details.get('writeErrors', []))
+            self.last_error = e
+        except Exception as e:
+            failed = len(batch)
+            self.last_error = e
+        finished = time.perf_counter()
+
+        counters['batches'] += 1
+        counters['max_batch'] = max(counters['max_batch'], len(batch))
+        counters['written'] += len(batch) - failed
+        counters['failed'] += failed
+        counters['write_seconds'] += finished - started
+        counters['max_write_seconds'] = max(counters['max_write_seconds'], finished - started)
+        for enqueued_at, _ in batch:
+            counters['wait_seconds'] += finished - enqueued_at
+            counters['max_wait_seconds'] = max(counters['max_wait_seconds'], finished - enqueued_at)
+
+
+def open_repository(backend=None, **options):
+    """
+    Create a repository for the configured storage backend.
+
+    Parameters:
+    - backend: 'mongo' or 'sqlite'; defaults to BACKEND (MESHGEN_DB_BACKEND).
+    - options: Passed to the repository, e.g. uri= and pool settings for
+      mongo or path= for sqlite (defaults to SQLITE_PATH).
+
+    Both backends have the same async interface: insert, insert_many,
+    find, iter_find, find_page, update, delete, ensure_indexes and close.
+    """
+    backend = backend or BACKEND
+    if backend == 'mongo':
+        return MeshRepository(**options)
+    if backend == 'sqlite':
+        from Model.sqliteStore import SQLiteRepository
+        return SQLiteRepository(**dict({'path': SQLITE_PATH}, **options))
+    raise ValueError(f"Unknown storage backend {backend!r}, expected 'mongo' or 'sqlite'")
+
+
+# Shared repository used by the module-level functions below
+_repository = None
+
+
+def get_repository():
+    global _repository
+    if _repository is None:
+        _repository = open_repository()
+        if QUERY_CACHE_TTL > 0:
+            from Model.queryCache import CachedRepository
+            _repository = CachedRepository(_repository, ttl=QUERY_CACHE_TTL)
+    return _repository
+
+
+async def shared_repository():
+    # get_repository() with INDEXES declared; only the first call creates them
+    repository = get_repository()
+    await repository.ensure_indexes()
+    return repository
+
 
 # Send a ping to confirm a successful connection
 async def check_connection():
     try:
-        # Send a ping to confirm a successful connection
-        await client.admin.command('ping')
+        # Send a ping to confirm a successful connection; this also declares the indexes at startup
+        repository = await shared_repository()
+        await repository.ping()
         print("Pinged your deployment. You successfully connected to MongoDB!")
     except Exception as e:
         print("Failed to connect:", e)
 
-# Get the database and collection
-db = client['meshDB']
-collection = db['parameters']
-
 async def insert_document(*args):
-    document = create_document_schema(*args)
-    result = collection.insert_one(document)
-    return result.inserted_id
+    repository = await shared_repository()
+    return await repository.insert(*args)
 
 async def delete_document(document_ids):
-    result = collection.delete_many({'_id': {'$in': [ObjectId(id) for id in document_ids]}})
-    return result.deleted_count
+    repository = await shared_repository()
+    return await repository.delete(document_ids)
 
 async def update_document(updates):
-    # Prepare bulk update operations
-    operations = []
-    for update in updates:
-        doc_filter = {'_id': ObjectId(update['documentId'])}
-        updated_values = {'$set': update['update_values']}
-        operations.append(UpdateOne(doc_filter, updated_values))
-    
-    if operations:
-        result = await collection.bulk_write(operations)
-        return result.bulk_api_result
-    return None
+    repository = await shared_repository()
+    return await repository.update(updates)
 
 async def find_document(query):
-    cursor = collection.find(query)
-    documents = collection.find(query)
-    return list(documents)
+    repository = await shared_repository()
+    return await repository.find(query)
 
 # Master function to handle database operations
 async def database(operation_type, entry):
-    await client.start_session()
-    try:
-        result = None
-        if operation_type == 'insert':
-            result = await insert_document(*entry)
-            print("Inserted IDs:", result)
-        elif operation_type == 'delete':
-            result = await delete_document(entry)
-            print("Deleted count:", result)
-        elif operation_type == 'find':
-            result = await find_document(entry)
-            print("Found documents:", result)
-        elif operation_type == 'update':
-            result = await update_document(entry)
-            print("Updated count:", result)
+    result = None
+    if operation_type == 'insert':
+        # entry is a ParameterRecord or the arguments of create_document_schema
+        if isinstance(entry, ParameterRecord):
+            result = await insert_document(entry)
         else:
-            print("Invalid operation type.")
-    finally:
-        pass  # Handle any cleanup if necessary
+            result = await insert_document(*entry)
+        print("Inserted IDs:", result)
+    elif operation_type == 'delete':
+        result = await delete_document(entry)
+        print("Deleted count:", result)
+    elif operation_type == 'find':
+        result = await find_document(entry)
+        print("Found documents:", result)
+    elif operation_type == 'update':
+        result = await update_document(entry)
+        print("Updated count:", result)
+    else:
+        print("Invalid operation type.")
+    return result
 
 # Example usage:
 """
 if __name__ == "__main__":
     asyncio.run(check_connection())
-"""
\ No newline at end of file
+"""
@@ -0,0 +1,49 @@
+# documentSchema field -> ParameterRecord attribute (preset key), in document order
+DOCUMENT_FIELDS = {
+    'SizeX': 'width',
+    'SizeY': 'height',
+    'MaxZ': 'max_height',
+    'Smoothness': 'smoothness',
+    'MinVX': 'minVerticesX',
+    'MaxVX': 'maxVerticesX',
+    'MinVY': 'minVerticesY',
+    'MaxVY': 'maxVerticesY',
+    'RockDen': 'rocks_density',
+    'BushDen': 'bushes_density',
+    'TreeDen': 'trees_density',
+    'LogDen': 'logs_density',
+    'StickDen': 'sticks_density',
+    'BoulderDen': 'boulders_density',
+}
+
+
+def create_document_schema(gen_name, *values, artifacts=None):
+    """
+    Build a parameters document.
+
+    Parameters:
+    - gen_name: A Model.parameters.ParameterRecord on its own, whose name
+      and values are used; or the GenName followed by one value per
+      DOCUMENT_FIELDS entry, in order (size_x, size_y, max_z, smoothness,
+      min_vx, max_vx, min_vy, max_vy, rock_den, bush_den, tree_den,
+      log_den, stick_den, boulder_den).
+    - artifacts: Asset ids in the chunk store (Model/blobStore.py), e.g.
+      {'heightmap': ..., 'mesh': ...}.
+
+    Returns:
+    - The document as a dict.
+    """
+    if not values and hasattr(gen_name, 'to_preset'):
+        record = gen_name
+        gen_name, values = record.name, [getattr(record, field) for field in DOCUMENT_FIELDS.values()]
+    if len(values) != len(DOCUMENT_FIELDS):
+        raise TypeError(
+            f"create_document_schema takes a ParameterRecord or {len(DOCUMENT_FIELDS) + 1} values, "
+            f"got {len(values) + 1}"
+        )
+
+    document = {'GenName': gen_name}
+    document.update(zip(DOCUMENT_FIELDS, values))
+    if artifacts:
+        document['Artifacts'] = artifacts
+    return document
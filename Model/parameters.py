@@ -0,0 +1,217 @@
+import numbers
+from Controller.Gen.presets import DEFAULT_PRESET, OBJECT_KINDS, preset_hash
+from Model.documentSchema import DOCUMENT_FIELDS, create_document_schema
+
+# Field names of every binary record version, in encoding order. Records
+# are encoded without names, so changing the keys of DEFAULT_PRESET needs a
+# new version here (checked below FIELDS); older records still decode by
+# their own list and get defaults for the keys they lack.
+RECORD_FIELDS = {
+    1: (
+        'seed', 'noise_type', 'width', 'height', 'scale', 'octaves', 'persistence', 'lacunarity',
+        'resolution_factor', 'base_elevation', 'min_height', 'max_height', 'smoothness',
+        'minVerticesX', 'maxVerticesX', 'minVerticesY', 'maxVerticesY',
+        'erosion_droplets', 'thermal_iterations', 'thermal_talus',
+        'add_trees', 'trees_density', 'add_rocks', 'rocks_density', 'add_sticks', 'sticks_density',
+        'add_logs', 'logs_density', 'add_bushes', 'bushes_density', 'add_boulders', 'boulders_density',
+        'add_volcano', 'volcano_density', 'add_mushroom', 'mushroom_density',
+    ),
+}
+RECORD_VERSION = max(RECORD_FIELDS)
+
+NOISE_TYPES = ('Perlin', 'Simplex', 'Value', 'Cellular')
+SWITCH_VALUES = ('on', 'off')
+
+# Type and minimum (or allowed values) of the preset keys. Ranges only
+# reject values the generator can't use; the GUI sliders are narrower. Keys
+# missing here are unchecked strings or numbers, like their default.
+FIELD_RULES = {
+    'seed': (int, 0),
+    'noise_type': (str, NOISE_TYPES),
+    'width': (int, 2),
+    'height': (int, 2),
+    'scale': (float, 1e-9),
+    'octaves': (int, 1),
+    'persistence': (float, 0),
+    'lacunarity': (float, 0),
+    'resolution_factor': (float, 1e-9),
+    'base_elevation': (float, None),
+    'min_height': (float, None),
+    'max_height': (float, None),
+    'smoothness': (int, 0),
+    'minVerticesX': (int, 2),
+    'maxVerticesX': (int, 2),
+    'minVerticesY': (int, 2),
+    'maxVerticesY': (int, 2),
+    'erosion_droplets': (int, 0),
+    'thermal_iterations': (int, 0),
+    'thermal_talus': (float, 0),
+}
+FIELD_RULES.update(
+    (key, rule)
+    for switch, density in OBJECT_KINDS.values()
+    for key, rule in ((switch, (str, SWITCH_VALUES)), (density, (float, 0)))
+)
+
+
+def _field(name, default):
+    kind, limit = FIELD_RULES.get(name, (str if isinstance(default, str) else float, None))
+    return (name, kind, default, limit)
+
+
+# (name, type, default, minimum or allowed values), in encoding order: the
+# keys and defaults of Controller.Gen.presets.DEFAULT_PRESET, so records and
+# preset dicts can't drift apart
+FIELDS = tuple(_field(name, default) for name, default in DEFAULT_PRESET.items())
+if tuple(field[0] for field in FIELDS) != RECORD_FIELDS[RECORD_VERSION]:
+    raise RuntimeError("DEFAULT_PRESET keys changed: add a RECORD_FIELDS version listing them")
+
+
+def _coerce(name, kind, value, limit):
+    # Validate one value; integral floats become ints like normalise_preset does
+    if kind is str:
+        if not isinstance(value, str):
+            raise ValueError(f"{name} must be a string, got {value!r}")
+        if limit is not None and value not in limit:
+            raise ValueError(f"{name} must be one of {', '.join(limit)}, got {value!r}")
+        return value
+    if value is None and name == 'seed':
+        return None
+    if isinstance(value, bool) or not isinstance(value, numbers.Real):
+        raise ValueError(f"{name} must be a number, got {value!r}")
+    if kind is int and value != int(value):
+        raise ValueError(f"{name} must be a whole number, got {value!r}")
+    if value == int(value):
+        value = int(value)
+    else:
+        value = float(value)
+    if limit is not None and value < limit:
+        raise ValueError(f"{name} must be at least {limit}, got {value!r}")
+    return value
+
+
+class ParameterRecord:
+    """
+    Typed, validated generation parameters.
+
+    One record holds everything a preset file, the GUI sliders, the
+    pipeline and a database document describe, with the preset keys as
+    attribute names plus a name (the document's GenName). Records use
+    __slots__, so large preset tables stay small, and are read-only once
+    built; use replace() for a changed copy.
+
+        record = ParameterRecord.from_preset(load_preset("hills.json"), name="hills")
+        run_preset(record.to_preset(), output_dir)
+        data = record.encode()
+
+    hash() equals Controller.Gen.presets.preset_hash of the same preset, so
+    records and preset dicts share cache keys and batch directories.
+    """
+
+    __slots__ = ('name',) + tuple(field[0] for field in FIELDS)
+
+    def __init__(self, name='', **values):
+        unknown = set(values) - {field[0] for field in FIELDS}
+        if unknown:
+            raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+        errors = []
+        object.__setattr__(self, 'name', str(name))
+        for field, kind, default, limit in FIELDS:
+            try:
+                object.__setattr__(self, field, _coerce(field, kind, values.get(field, default), limit))
+            except ValueError as e:
+                errors.append(str(e))
+        if not errors and self.min_height > self.max_height:
+            errors.append(f"min_height ({self.min_height}) is above max_height ({self.max_height})")
+        if errors:
+            raise ValueError("Invalid parameters: " + "; ".join(errors))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ParameterRecord is read-only, use replace()")
+
+    def __eq__(self, other):
+        return isinstance(other, ParameterRecord) and self.as_tuple() == other.as_tuple()
+
+    def __hash__(self):
+        return hash(self.as_tuple())
+
+    def __reduce__(self):
+        # Slots are read-only, so rebuild through the constructor when unpickling
+        return (self.__class__.from_preset, (self.to_preset(), self.name))
+
+    def __repr__(self):
+        changed = ", ".join(
+            f"{field}={getattr(self, field)!r}" for field, _, default, _ in FIELDS if getattr(self, field) != default
+        )
+        return f"ParameterRecord(name={self.name!r}{', ' + changed if changed else ''})"
+
+    def as_tuple(self):
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def replace(self, **changes):
+        values = self.to_preset()
+        name = changes.pop('name', self.name)
+        values.update(changes)
+        return ParameterRecord(name, **values)
+
+    # Presets (GUI, pipeline, batch tools)
+
+    @classmethod
+    def from_preset(cls, preset_data, name=''):
+        # Keys the record doesn't know (e.g. from newer versions) are dropped
+        known = {field[0] for field in FIELDS}
+        return cls(name, **{key: value for key, value in preset_data.items() if key in known})
+
+    def to_preset(self):
+        return {field: getattr(self, field) for field, _, _, _ in FIELDS}
+
+    def hash(self):
+        return preset_hash(self.to_preset())
+
+    # Database documents
+
+    def to_document(self, artifacts=None):
+        return create_document_schema(self, artifacts=artifacts)
+
+    @classmethod
+    def from_document(cls, document):
+        # Documents only hold part of the parameters; the rest get defaults
+        values = {field: document[key] for key, field in DOCUMENT_FIELDS.items() if key in document}
+        max_height = values.get('max_height')
+        if isinstance(max_height, numbers.Real):
+            # Only MaxZ is stored; keep the default min_height from rising above it
+            values['min_height'] = min(DEFAULT_PRESET['min_height'], max_height)
+        return cls(document.get('GenName', ''), **values)
+
+    # Binary encoding
+
+    def encode(self):
+        """
+        Compact binary form: the values in slot order, without field names.
+
+        Uses msgpack when it is installed and BSON (from pymongo) otherwise;
+        decode() reads both.
+        """
+        values = [RECORD_VERSION] + list(self.as_tuple())
+        try:
+            import msgpack
+        except ImportError:
+            import bson
+            return b'B' + bson.encode({'r': values})
+        return b'M' + msgpack.packb(values)
+
+    @classmethod
+    def decode(cls, data):
+        marker, body = data[:1], data[1:]
+        if marker == b'M':
+            import msgpack
+            values = msgpack.unpackb(body)
+        elif marker == b'B':
+            import bson
+            values = bson.decode(body)['r']
+        else:
+            raise ValueError("Not an encoded ParameterRecord")
+        if values[0] not in RECORD_FIELDS:
+            raise ValueError(f"Unsupported record version {values[0]}")
+        version, name, values = values[0], values[1], values[2:]
+        return cls.from_preset(dict(zip(RECORD_FIELDS[version], values)), name)
@@ -0,0 +1,193 @@
+from bson import ObjectId
+from collections import OrderedDict
+import json
+import time
+from Model.documentSchema import create_document_schema
+
+_COMPARE = {
+    '$gt': lambda a, b: a > b,
+    '$gte': lambda a, b: a >= b,
+    '$lt': lambda a, b: a < b,
+    '$lte': lambda a, b: a <= b,
+}
+
+
+def query_key(query, projection=None):
+    # Canonical text of a query, so equal queries share an entry whatever their key order
+    def encode(value):
+        if isinstance(value, ObjectId):
+            return {'$oid': str(value)}
+        return str(value)
+    return json.dumps([query or {}, projection], sort_keys=True, default=encode)
+
+
+def query_fields(query):
+    # Top-level document fields a filter looks at ('a' for a dotted 'a.b')
+    fields = set()
+    for field, value in (query or {}).items():
+        if field in ('$and', '$or'):
+            for sub_query in value:
+                fields |= query_fields(sub_query)
+        else:
+            fields.add(field.split('.')[0])
+    return fields
+
+
+def matches(document, query):
+    """
+    Evaluate a filter against one document in Python.
+
+    Understands the same subset as the SQLite backend: equality,
+    $eq/$ne/$gt/$gte/$lt/$lte, $in/$nin, $exists, $and and $or on
+    top-level fields. Anything else (other operators, dotted paths)
+    raises ValueError.
+    """
+    for field, condition in (query or {}).items():
+        if field == '$and':
+            if not all(matches(document, sub_query) for sub_query in condition):
+                return False
+            continue
+        if field == '$or':
+            if not any(matches(document, sub_query) for sub_query in condition):
+                return False
+            continue
+        if field.startswith('$') or '.' in field:
+            raise ValueError(f"Unsupported query field {field}")
+        value = document.get(field)
+        operators = condition if isinstance(condition, dict) and condition and all(key.startswith('$') for key in condition) else {'$eq': condition}
+        for operator, argument in operators.items():
+            if operator == '$eq':
+                ok = value == argument
+            elif operator == '$ne':
+                ok = value != argument
+            elif operator == '$in':
+                ok = value in argument
+            elif operator == '$nin':
+                ok = value not in argument
+            elif operator == '$exists':
+                ok = (field in document) == bool(argument)
+            elif operator in _COMPARE:
+                try:
+                    ok = value is not None and _COMPARE[operator](value, argument)
+                except TypeError:
+                    ok = False
+            else:
+                raise ValueError(f"Unsupported query operator {operator}")
+            if not ok:
+                return False
+    return True
+
+
+class CachedRepository:
+    """
+    Read-through LRU/TTL cache for find() in front of a repository.
+
+    Results are cached by normalised query and projection for ttl seconds,
+    at most max_entries of them, least recently used first out. Writes
+    made through this object invalidate exactly the entries they can
+    affect:
+
+    - delete: entries whose result holds a deleted id
+    - update: entries whose result holds an updated id, or whose filter
+      looks at an updated field (the document may now match)
+    - insert: entries whose filter matches the new document
+
+    Writes made elsewhere are only picked up when entries expire. Other
+    methods (iter_find, find_page, ...) go straight to the repository.
+    find() returns shallow copies of the cached documents.
+    """
+
+    def __init__(self, repository, max_entries=256, ttl=30.0):
+        self.repository = repository
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (expires_at, query, ids, documents)
+        self._entries = OrderedDict()
+        # Bumped by every write, so a find that raced with one isn't cached
+        self._generation = 0
+        self.metrics = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def __getattr__(self, name):
+        return getattr(self.repository, name)
+
+    async def __aenter__(self):
+        await self.repository.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.repository.__aexit__(*exc_info)
+
+    async def find(self, query, projection=None):
+        key = query_key(query, projection)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.metrics['hits'] += 1
+                return [dict(document) for document in entry[3]]
+            del self._entries[key]
+            self.metrics['expirations'] += 1
+        self.metrics['misses'] += 1
+
+        generation = self._generation
+        documents = await self.repository.find(query, projection)
+        # Results without _id can't be invalidated by id, so they aren't cached
+        if generation == self._generation and (projection or {}).get('_id', 1):
+            ids = {str(document['_id']) for document in documents}
+            self._entries[key] = (time.monotonic() + self.ttl, query or {}, ids, documents)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.metrics['evictions'] += 1
+        return [dict(document) for document in documents]
+
+    def _invalidate(self, should_drop):
+        # Entries the check can't evaluate (e.g. unsupported operators) are
+        # dropped too: invalidation runs in finally and must never raise
+        def drop(entry):
+            try:
+                return should_drop(entry)
+            except Exception:
+                return True
+
+        self._generation += 1
+        for key in [key for key, entry in self._entries.items() if drop(entry)]:
+            del self._entries[key]
+            self.metrics['invalidations'] += 1
+
+    def clear(self):
+        self._invalidate(lambda entry: True)
+
+    def stats(self):
+        lookups = self.metrics['hits'] + self.metrics['misses']
+        return dict(self.metrics, entries=len(self._entries), hit_rate=self.metrics['hits'] / lookups if lookups else 0.0)
+
+    async def insert_document(self, document):
+        try:
+            return await self.repository.insert_document(document)
+        finally:
+            self._invalidate(lambda entry: matches(document, entry[1]))
+
+    async def insert(self, *args):
+        # A ParameterRecord, or the positional arguments of create_document_schema
+        return await self.insert_document(create_document_schema(*args))
+
+    async def insert_many(self, documents, ordered=False):
+        try:
+            return await self.repository.insert_many(documents, ordered=ordered)
+        finally:
+            self._invalidate(lambda entry: any(matches(document, entry[1]) for document in documents))
+
+    async def delete(self, document_ids):
+        ids = {str(ObjectId(id)) for id in document_ids}
+        try:
+            return await self.repository.delete(document_ids)
+        finally:
+            self._invalidate(lambda entry: not ids.isdisjoint(entry[2]))
+
+    async def update(self, updates):
+        ids = {str(ObjectId(update['documentId'])) for update in updates}
+        fields = {field.split('.')[0] for update in updates for field in update['update_values']}
+        try:
+            return await self.repository.update(updates)
+        finally:
+            self._invalidate(lambda entry: not ids.isdisjoint(entry[2]) or not fields.isdisjoint(query_fields(entry[1])))
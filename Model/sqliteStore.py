@@ -0,0 +1,244 @@
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+import asyncio
+import json
+import re
+import sqlite3
+import threading
+from Model.database import INDEXES, _after_filter, _sort_spec
+from Model.documentSchema import create_document_schema
+
+_FIELD = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+_COMPARISONS = {'$eq': '=', '$ne': '!=', '$gt': '>', '$gte': '>=', '$lt': '<', '$lte': '<='}
+
+
+def _column(field):
+    # SQL expression for a top-level document field; names are inlined, so check them
+    if field == '_id':
+        return 'id'
+    if not _FIELD.match(field):
+        raise ValueError(f"Unsupported field name {field!r}")
+    return f"json_extract(doc, '$.{field}')"
+
+
+def _param(field, value):
+    return str(value) if field == '_id' else value
+
+
+def _where(query, params):
+    """
+    Translate a Mongo-style filter into an SQL condition.
+
+    Supports equality, $eq/$ne/$gt/$gte/$lt/$lte, $in/$nin, $exists and
+    nested $and/$or on top-level fields, which covers the queries the app
+    and the repository's pagination make.
+    """
+    clauses = []
+    for field, value in query.items():
+        if field in ('$and', '$or'):
+            parts = [_where(sub_query, params) for sub_query in value]
+            if not parts:
+                clauses.append('1' if field == '$and' else '0')
+            else:
+                clauses.append('(' + (' AND ' if field == '$and' else ' OR ').join(parts) + ')')
+            continue
+        column = _column(field)
+        operators = value if isinstance(value, dict) and value and all(key.startswith('$') for key in value) else {'$eq': value}
+        for operator, argument in operators.items():
+            if operator in ('$in', '$nin'):
+                argument = list(argument)
+                placeholders = ', '.join('?' * len(argument))
+                clauses.append(f"{column} {'NOT IN' if operator == '$nin' else 'IN'} ({placeholders})")
+                params.extend(_param(field, item) for item in argument)
+            elif operator == '$exists':
+                clauses.append(f"{column} IS {'NOT NULL' if argument else 'NULL'}")
+            elif operator in _COMPARISONS:
+                if argument is None and operator in ('$eq', '$ne'):
+                    clauses.append(f"{column} IS {'NULL' if operator == '$eq' else 'NOT NULL'}")
+                else:
+                    clauses.append(f"{column} {_COMPARISONS[operator]} ?")
+                    params.append(_param(field, argument))
+            else:
+                raise ValueError(f"Unsupported query operator {operator}")
+    return ' AND '.join(clauses) or '1'
+
+
+def _project(document, projection):
+    if not projection:
+        return document
+    if any(value for key, value in projection.items() if key != '_id'):
+        keep = {key for key, value in projection.items() if value}
+        if projection.get('_id', 1):
+            keep.add('_id')
+        return {key: value for key, value in document.items() if key in keep}
+    return {key: value for key, value in document.items() if projection.get(key, 1)}
+
+
+class SQLiteRepository:
+    """
+    Embedded local backend with the same async interface as MeshRepository.
+
+    Documents are stored as JSON in one SQLite table, with their ObjectId
+    as the primary key, and INDEXES become expression indexes on the JSON
+    fields. Queries take the Mongo filter subset understood by _where.
+
+    All SQL runs on worker threads through one connection guarded by a
+    lock, so the event loop never blocks. path=':memory:' gives a private
+    in-memory database, handy for tests.
+    """
+
+    def __init__(self, path='meshDB.sqlite3', table='parameters'):
+        if not _FIELD.match(table):
+            raise ValueError(f"Unsupported table name {table!r}")
+        self.path = path
+        self.table = table
+        self._connection = None
+        self._lock = threading.Lock()
+        self._indexes_ready = False
+
+    async def __aenter__(self):
+        await self.ensure_indexes()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(f"CREATE TABLE IF NOT EXISTS {self.table} (id TEXT PRIMARY KEY, doc TEXT NOT NULL)")
+        return self._connection
+
+    async def _run(self, function, *args):
+        # Run function(connection, *args) on a worker thread inside one transaction
+        def call():
+            with self._lock:
+                connection = self._connect()
+                with connection:
+                    return function(connection, *args)
+        return await asyncio.to_thread(call)
+
+    async def close(self):
+        def close():
+            with self._lock:
+                if self._connection is not None:
+                    self._connection.close()
+                    self._connection = None
+        await asyncio.to_thread(close)
+
+    async def ping(self):
+        await self._run(lambda connection: connection.execute('SELECT 1').fetchone())
+
+    async def ensure_indexes(self):
+        if self._indexes_ready:
+            return
+
+        def create(connection):
+            for index in INDEXES:
+                columns = ', '.join(
+                    f"{_column(field)} {'DESC' if direction < 0 else 'ASC'}"
+                    for field, direction in index.document['key'].items()
+                )
+                connection.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_{index.document['name']} ON {self.table} ({columns})")
+        await self._run(create)
+        self._indexes_ready = True
+
+    async def insert_document(self, document):
+        return (await self.insert_many([document], ordered=True))[0]
+
+    async def insert(self, *args):
+        # A ParameterRecord, or the positional arguments of create_document_schema
+        return await self.insert_document(create_document_schema(*args))
+
+    async def insert_many(self, documents, ordered=False):
+        # Like Mongo, documents get an _id if they have none; failures raise BulkWriteError
+        for document in documents:
+            document.setdefault('_id', ObjectId())
+
+        def insert(connection):
+            inserted, errors = [], []
+            for position, document in enumerate(documents):
+                body = {key: value for key, value in document.items() if key != '_id'}
+                try:
+                    connection.execute(f"INSERT INTO {self.table} (id, doc) VALUES (?, ?)",
+                                       (str(document['_id']), json.dumps(body)))
+                    inserted.append(document['_id'])
+                except sqlite3.IntegrityError as e:
+                    errors.append({'index': position, 'errmsg': str(e)})
+                    if ordered:
+                        break
+            return inserted, errors
+
+        inserted, errors = await self._run(insert)
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'nInserted': len(inserted)})
+        return inserted
+
+    async def delete(self, document_ids):
+        ids = [str(ObjectId(id)) for id in document_ids]
+        if not ids:
+            return 0
+
+        def delete(connection):
+            placeholders = ', '.join('?' * len(ids))
+            return connection.execute(f"DELETE FROM {self.table} WHERE id IN ({placeholders})", ids).rowcount
+        return await self._run(delete)
+
+    async def update(self, updates):
+        # updates: [{'documentId': ..., 'update_values': {...}}, ...]
+        if not updates:
+            return None
+
+        def update(connection):
+            matched = modified = 0
+            for item in updates:
+                document_id = str(ObjectId(item['documentId']))
+                row = connection.execute(f"SELECT doc FROM {self.table} WHERE id = ?", (document_id,)).fetchone()
+                if row is None:
+                    continue
+                matched += 1
+                document = json.loads(row[0])
+                changed = dict(document, **item['update_values'])
+                if changed != document:
+                    modified += 1
+                    connection.execute(f"UPDATE {self.table} SET doc = ? WHERE id = ?", (json.dumps(changed), document_id))
+            return {'nMatched': matched, 'nModified': modified}
+        return await self._run(update)
+
+    async def _select(self, query, sort=None, limit=0):
+        params = []
+        sql = f"SELECT id, doc FROM {self.table} WHERE {_where(query or {}, params)}"
+        if sort:
+            sql += ' ORDER BY ' + ', '.join(
+                f"{_column(field)} {'DESC' if direction < 0 else 'ASC'}" for field, direction in sort
+            )
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        rows = await self._run(lambda connection: connection.execute(sql, params).fetchall())
+        return [dict(json.loads(doc), _id=ObjectId(id)) for id, doc in rows]
+
+    async def find(self, query, projection=None):
+        return [_project(document, projection) for document in await self._select(query)]
+
+    async def find_page(self, query=None, projection=None, sort=None, limit=100, after=None):
+        # Same keyset pagination and tokens as MeshRepository.find_page
+        sort = _sort_spec(sort)
+        query = dict(query or {})
+        if after is not None:
+            query = {'$and': [query, _after_filter(sort, after)]} if query else _after_filter(sort, after)
+        documents = await self._select(query, sort, limit)
+        token = None
+        if len(documents) == limit:
+            token = {field: documents[-1].get(field) for field, _ in sort}
+        return [_project(document, projection) for document in documents], token
+
+    async def iter_find(self, query=None, projection=None, sort=None, batch_size=500):
+        # Streams page by page, so no cursor stays open between batches
+        token = None
+        while True:
+            documents, token = await self.find_page(query, projection, sort, batch_size, token)
+            for document in documents:
+                yield document
+            if token is None:
+                break
@@ -0,0 +1,85 @@
+"""
+Headless batch generation.
+
+Runs the noise, mesh, object and export pipeline for one or more preset
+JSON files (as written by the GUI's Save button) on a pool of worker
+processes. Each preset gets its own output directory named after the
+preset and its hash; directories that already hold a finished manifest
+are skipped, so an interrupted batch can simply be started again. With
+--store, every job's elevation and mesh also go into a deduplicating
+chunk store; the asset ids are in the job's manifest.
+
+Example:
+    python batchgen.py presets/*.json --output GeneratedMeshes/batch --jobs 8
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from Controller.Gen.pipeline import is_complete, run_preset
+from Controller.Gen.presets import load_preset, preset_hash, preset_name
+from Model.blobStore import ChunkStore
+
+
+def job_output_dir(output_root, preset_path, preset):
+    return os.path.join(output_root, f"{preset_name(preset_path)}-{preset_hash(preset)[:12]}")
+
+
+def run_job(preset, output_dir, store_root=None):
+    started = time.perf_counter()
+    run_preset(preset, output_dir, store=ChunkStore(store_root) if store_root else None)
+    return time.perf_counter() - started
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate terrain meshes from preset files without the GUI.")
+    parser.add_argument("presets", nargs="+", help="Preset JSON files")
+    parser.add_argument("-o", "--output", default="GeneratedMeshes", help="Root directory for job outputs")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Number of worker processes")
+    parser.add_argument("--force", action="store_true", help="Regenerate jobs that already finished")
+    parser.add_argument("--store", help="Chunk store directory for the generated artifacts")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    jobs = []
+    for preset_path in args.presets:
+        preset = load_preset(preset_path)
+        output_dir = job_output_dir(args.output, preset_path, preset)
+        if not args.force and is_complete(output_dir, preset_hash(preset)):
+            print(f"skip  {preset_path}: already generated in {output_dir}")
+            continue
+        jobs.append((preset_path, preset, output_dir))
+
+    total = len(jobs)
+    failures = 0
+    batch_started = time.perf_counter()
+    if total == 0:
+        print("Nothing to do.")
+        return 0
+
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        futures = {
+            executor.submit(run_job, preset, output_dir, args.store): (preset_path, output_dir)
+            for preset_path, preset, output_dir in jobs
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            preset_path, output_dir = futures[future]
+            try:
+                elapsed = future.result()
+                print(f"[{done}/{total}] done  {preset_path} in {elapsed:.2f}s -> {output_dir}")
+            except Exception as e:
+                failures += 1
+                print(f"[{done}/{total}] FAILED {preset_path}: {e}", file=sys.stderr)
+            sys.stdout.flush()
+
+    print(f"{total - failures}/{total} jobs finished in {time.perf_counter() - batch_started:.2f}s")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Import-time budget check for the generation core.
+
+Batch and pool workers are short-lived processes, so importing the core
+modules must stay cheap. Each module is imported in a fresh interpreter;
+the check fails if an import takes longer than the budget or drags in a
+GUI toolkit or a heavy optional dependency that should only be loaded on
+first use.
+
+Example:
+    python check_import_time.py --budget 0.5
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+CORE_MODULES = [
+    "Controller.Gen.seeding",
+    "Controller.Gen.presets",
+    "Controller.Gen.noisethingy",
+    "Controller.Gen.MeshGen",
+    "Controller.Gen.heightmesh",
+    "Controller.Gen.pipeline",
+    "Controller.Gen.erosion",
+    "Controller.Gen.gridpool",
+    "Controller.Gen.preview",
+    "Controller.Gen.artifacts",
+    "Controller.Gen.sweep",
+    "Controller.Gen.stamps",
+    "Controller.ObGen.shapes",
+    "Controller.ObGen.BushGen",
+    "Controller.ObGen.RockGen",
+    "Controller.ObGen.tree",
+    "Controller.ObGen.mushroom",
+    "Controller.ObGen.volcano",
+]
+
+# Modules that must not be loaded just by importing the core
+LAZY_MODULES = [
+    "tkinter",
+    "customtkinter",
+    "PyQt5",
+    "pyvista",
+    "matplotlib",
+    "collada",
+    "PIL",
+    "scipy",
+    "noise",
+]
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+__import__({module!r})
+elapsed = time.perf_counter() - started
+loaded = sorted(name for name in {lazy!r} if name in sys.modules)
+print(json.dumps({{"elapsed": elapsed, "loaded": loaded}}))
+"""
+
+
+def probe(module):
+    # Run the import in a clean interpreter so earlier imports don't hide costs
+    code = _PROBE.format(module=module, lazy=LAZY_MODULES)
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return json.loads(result.stdout)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the import-time budget of the generation core.")
+    parser.add_argument("--budget", type=float, default=0.5, help="Maximum seconds per module import")
+    parser.add_argument("modules", nargs="*", default=CORE_MODULES, help="Modules to check")
+    args = parser.parse_args(argv)
+
+    failures = 0
+    for module in args.modules:
+        try:
+            report = probe(module)
+        except RuntimeError as e:
+            failures += 1
+            print(f"FAIL {module}: import error: {e}")
+            continue
+        problems = []
+        if report["elapsed"] > args.budget:
+            problems.append(f"over budget ({report['elapsed']:.3f}s > {args.budget:.3f}s)")
+        if report["loaded"]:
+            problems.append("eagerly imports " + ", ".join(report["loaded"]))
+        status = "FAIL" if problems else "ok  "
+        failures += bool(problems)
+        print(f"{status} {module}: {report['elapsed'] * 1000:.1f} ms" + (" - " + "; ".join(problems) if problems else ""))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,8 @@
 import customtkinter as ctk
 import json
+import queue
+import shutil
+import threading
 from tkinter import filedialog
 
 import numpy as np
@@ -7,23 +10,225 @@ import os
 import webbrowser as wb
 
 from Controller.Gen.noisethingy import *
+from Controller.Gen.artifacts import DEFAULT_CACHE_DIR, ArtifactCache
+from Controller.Gen.pipeline import GenerationCancelled, run_preset
+from Controller.Gen.presets import DEFAULT_PRESET
+from Controller.Gen.preview import PREVIEW_SIZES, render_preview
+from Controller.Gen.seeding import new_master_seed
+from Model.blobStore import ChunkStore
+from Model.parameters import ParameterRecord
+
+# Background generation state. Only the Tk thread reads or writes widgets;
+# the worker thread reports through generation_queue, polled with root.after.
+generation_queue = queue.Queue()
+generation_job = {"id": 0, "cancel": None, "polling": False}
+# Jobs write into their own staging directory and swap it into place under
+# this lock, so a superseded job can never overwrite a newer job's files
+output_lock = threading.Lock()
+
+# Live preview state. Parameter changes are debounced with root.after; each
+# preview is drawn at the smallest size right away and refined on a worker
+# thread, which is cancelled as soon as the parameters change again.
+PREVIEW_DELAY_MS = 120
+PREVIEW_DISPLAY_WIDTH = 170
+preview_queue = queue.Queue()
+preview_job = {"id": 0, "cancel": None, "after": None, "polling": False}
+
+# Presets known to the option menu, by name, and the artifacts generated from
+# them. Picking a preset that was generated before shows its cached terrain
+# right away and generating it again only copies the files.
+preset_library = {"Default": dict(DEFAULT_PRESET)}
+artifact_cache = ArtifactCache(os.path.join(os.getcwd(), DEFAULT_CACHE_DIR))
+# Deduplicated copies of every generated elevation and mesh
+chunk_store = ChunkStore(os.path.join(os.getcwd(), "GeneratedMeshes", ".blobs"))
+
+
+def get_seed():
+    # Use the seed typed into the seed box, or draw (and show) a new one
+    seed_text = seed_entry.get().strip()
+    if seed_text.isdigit():
+        return int(seed_text)
+    seed = new_master_seed()
+    seed_entry.delete(0, "end")
+    seed_entry.insert(0, str(seed))
+    return seed
 
 
 def generate_noise():
-    export_image(
-        int(width_slider.get()),
-        int(height_slider.get()),
-        int(scale_slider.get()),
-        int(octaves_slider.get()),
-        int(persistence_slider.get()),
-        int(lacunarity_slider.get()),
-        np.random.randint(0, 100),
-        noise_type_dropdown.get(),
+    # Start a generation job in the background, superseding any running one.
+    # Widgets must be read here, on the Tk thread.
+    try:
+        record = ParameterRecord.from_preset(get_preset_data(), name=presets_optionmenu.get())
+    except ValueError as e:
+        generation_status_label.configure(text=str(e))
+        generation_frame.grid()
+        return
+    # Seedless presets (such as "Default") are generated with a freshly drawn
+    # seed; keep it, so picking the preset again finds what was cached
+    stored = preset_library.get(presets_optionmenu.get())
+    if stored is not None and stored.get("seed") is None:
+        stored["seed"] = record.seed
+    if generation_job["cancel"] is not None:
+        generation_job["cancel"].set()
+    generation_job["id"] += 1
+    generation_job["cancel"] = threading.Event()
+
+    preset_data = record.to_preset()
+    output_dir = os.path.join(os.getcwd(), "GeneratedMeshes", presets_optionmenu.get())
+    threading.Thread(
+        target=run_generation_job,
+        args=(generation_job["id"], preset_data, output_dir, generation_job["cancel"]),
+        daemon=True,
+    ).start()
+
+    generation_progressbar.set(0)
+    generation_status_label.configure(text="Generating...")
+    generation_frame.grid()
+    cancel_button.configure(state="normal")
+    if not generation_job["polling"]:
+        generation_job["polling"] = True
+        root.after(100, poll_generation)
+
+
+def run_generation_job(job_id, preset_data, output_dir, cancel):
+    # Runs on the worker thread: never touch Tk widgets here
+    def report(stage, fraction):
+        generation_queue.put((job_id, "progress", (stage, fraction)))
+
+    staging_dir = f"{output_dir}.tmp{os.getpid()}-{job_id}"
+    try:
+        manifest = run_preset(
+            preset_data, staging_dir, progress=report, cancel=cancel, cache=artifact_cache, store=chunk_store
+        )
+        with output_lock:
+            if cancel.is_set():
+                raise GenerationCancelled(output_dir)
+            shutil.rmtree(output_dir, ignore_errors=True)
+            os.replace(staging_dir, output_dir)
+        generation_queue.put((job_id, "done", manifest))
+    except GenerationCancelled:
+        generation_queue.put((job_id, "cancelled", None))
+    except Exception as e:
+        generation_queue.put((job_id, "error", str(e)))
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def poll_generation():
+    finished = False
+    while True:
+        try:
+            job_id, kind, payload = generation_queue.get_nowait()
+        except queue.Empty:
+            break
+        if job_id != generation_job["id"]:
+            continue  # Message from a superseded job
+        if kind == "progress":
+            stage, fraction = payload
+            generation_progressbar.set(fraction)
+            generation_status_label.configure(text=f"Generating: {stage} {int(fraction * 100)}%")
+        else:
+            finished = True
+            generation_job["cancel"] = None
+            cancel_button.configure(state="disabled")
+            if kind == "done":
+                generation_progressbar.set(1)
+                generation_status_label.configure(text="Done (cached)" if payload.get("cached") else "Done")
+            elif kind == "cancelled":
+                generation_status_label.configure(text="Cancelled")
+            else:
+                generation_status_label.configure(text=f"Failed: {payload}")
+    if finished:
+        generation_job["polling"] = False
+    else:
+        root.after(100, poll_generation)
+
+
+def cancel_generation():
+    if generation_job["cancel"] is not None:
+        generation_job["cancel"].set()
+        generation_status_label.configure(text="Cancelling...")
+
+
+def schedule_preview(*args):
+    # Restart the debounce timer; only the last change in a burst is rendered
+    if preview_job["after"] is not None:
+        root.after_cancel(preview_job["after"])
+    preview_job["after"] = root.after(PREVIEW_DELAY_MS, start_preview)
+
+
+def start_preview():
+    preview_job["after"] = None
+    if preview_job["cancel"] is not None:
+        preview_job["cancel"].set()
+    preview_job["id"] += 1
+    preview_job["cancel"] = threading.Event()
+
+    preset_data = get_preset_data()
+    try:
+        show_preview(render_preview(preset_data, PREVIEW_SIZES[0]))
+    except Exception as e:
+        preview_label.configure(text=f"No preview: {e}", image=None)
+        return
+    threading.Thread(
+        target=refine_preview,
+        args=(preview_job["id"], preset_data, preview_job["cancel"]),
+        daemon=True,
+    ).start()
+    if not preview_job["polling"]:
+        preview_job["polling"] = True
+        root.after(50, poll_preview)
+
+
+def refine_preview(job_id, preset_data, cancel):
+    # Runs on the worker thread: render the larger sizes, newest job only
+    try:
+        for size in PREVIEW_SIZES[1:]:
+            preview_queue.put((job_id, render_preview(preset_data, size, cancel)))
+    except GenerationCancelled:
+        pass
+    except Exception:
+        pass  # Keep showing the last size that could be rendered
+    preview_queue.put((job_id, None))
+
+
+def poll_preview():
+    latest = None
+    finished = False
+    while True:
+        try:
+            job_id, shade = preview_queue.get_nowait()
+        except queue.Empty:
+            break
+        if job_id != preview_job["id"]:
+            continue  # Refinement of outdated parameters
+        if shade is None:
+            finished = True
+        else:
+            latest = shade
+    if latest is not None:
+        show_preview(latest)
+    if finished:
+        preview_job["polling"] = False
+    else:
+        root.after(50, poll_preview)
+
+
+def show_preview(shade):
+    from PIL import Image
+
+    rows, cols = shade.shape
+    image = ctk.CTkImage(
+        light_image=Image.fromarray(shade),
+        size=(PREVIEW_DISPLAY_WIDTH, max(int(PREVIEW_DISPLAY_WIDTH * rows / cols), 1)),
     )
+    preview_label.configure(image=image, text="")
+    preview_label.image = image  # Keep a reference so Tk doesn't drop it
 
 
 def update_slider_label(label, text, value):
     label.configure(text=f"{text}: {int(value)}")
+    schedule_preview()
 
 
 def toggle_visibility(
@@ -41,10 +246,10 @@ def toggle_visibility(
         frame.configure(fg_color="#dfe1e1")
 
 
-# Save preset function
-def save_preset():
-    # Get all parameter values
-    preset_data = {
+# Collect all parameter values in the preset format
+def get_preset_data():
+    return {
+        "seed": get_seed(),
         "noise_type": noise_type_dropdown.get(),
         "width": width_slider.get(),
         "height": height_slider.get(),
@@ -78,6 +283,11 @@ def save_preset():
         "add_mushroom": add_mushroom_switch.get(),
         "mushroom_density": mushroom_slider.get(),
     }
+
+
+# Save preset function
+def save_preset():
+    preset_data = get_preset_data()
     # Open a file dialog for saving
     file_path = filedialog.asksaveasfilename(
         defaultextension=".json", filetypes=[("JSON files", "*.json")]
@@ -86,11 +296,7 @@ def save_preset():
         with open(file_path, "w") as f:
             json.dump(preset_data, f)
         # Update the option menu
-        preset_name = os.path.basename(file_path)[:-5]
-        presets_optionmenu.configure(
-            values=presets_optionmenu.cget("values") + [preset_name]
-        )
-        presets_optionmenu.set(preset_name)
+        add_to_presets_menu(os.path.basename(file_path)[:-5], preset_data)
 
 
 # Load preset function
@@ -100,47 +306,95 @@ def load_preset():
     if file_path:
         with open(file_path, "r") as f:
             preset_data = json.load(f)
-        # Update all parameter values
-        noise_type_dropdown.set(preset_data["noise_type"])
-        width_slider.set(preset_data["width"])
-        height_slider.set(preset_data["height"])
-        scale_slider.set(preset_data["scale"])
-        octaves_slider.set(preset_data["octaves"])
-        persistence_slider.set(preset_data["persistence"])
-        lacunarity_slider.set(preset_data["lacunarity"])
-        resolution_factor_slider.set(preset_data["resolution_factor"])
-        base_elevation_slider.set(preset_data["base_elevation"])
-        min_height_slider.set(preset_data["min_height"])
-        max_height_slider.set(preset_data["max_height"])
-        smoothness_slider.set(preset_data["smoothness"])
-        minVerticesX_slider.set(preset_data["minVerticesX"])
-        maxVerticesX_slider.set(preset_data["maxVerticesX"])
-        minVerticesY_slider.set(preset_data["minVerticesY"])
-        maxVerticesY_slider.set(preset_data["maxVerticesY"])
-        
-        # Update the labels
-        update_slider_label(width_label, "Mesh Width", preset_data["width"])
-        update_slider_label(height_label, "Mesh Height", preset_data["height"])
-        update_slider_label(scale_label, "Zoom Scale", preset_data["scale"])
-        update_slider_label(octaves_label, "Octaves", preset_data["octaves"])
-        update_slider_label(persistence_label, "Persistence", preset_data["persistence"])
-        update_slider_label(lacunarity_label, "Lacunarity", preset_data["lacunarity"])
-        update_slider_label(resolution_factor_label, "Resolution Factor", preset_data["resolution_factor"])
-        update_slider_label(base_elevation_label, "Base Elevation", preset_data["base_elevation"])
-        update_slider_label(min_height_label, "Min Height", preset_data["min_height"])
-        update_slider_label(max_height_label, "Max Height", preset_data["max_height"])
-        update_slider_label(smoothness_label, "Smoothness", preset_data["smoothness"])
-        update_slider_label(minVerticesX_label, "Min Vertices X", preset_data["minVerticesX"])
-        update_slider_label(maxVerticesX_label, "Max Vertices X", preset_data["maxVerticesX"])
-        update_slider_label(minVerticesY_label, "Min Vertices Y", preset_data["minVerticesY"])
-        update_slider_label(maxVerticesY_label, "Max Vertices Y", preset_data["maxVerticesY"])
-        
+        apply_preset(preset_data)
+
         # Update the option menu
-        preset_name = os.path.basename(file_path)[:-5]
+        add_to_presets_menu(os.path.basename(file_path)[:-5], preset_data)
+
+
+def add_to_presets_menu(preset_name, preset_data):
+    if preset_name not in preset_library:
         presets_optionmenu.configure(
             values=presets_optionmenu.cget("values") + [preset_name]
         )
-        presets_optionmenu.set(preset_name)
+    preset_library[preset_name] = preset_data
+    presets_optionmenu.set(preset_name)
+    show_cached_preset(preset_data)
+
+
+def select_preset(preset_name):
+    # Option menu callback: switch the sliders to a known preset
+    preset_data = preset_library[preset_name]
+    apply_preset(preset_data)
+    show_cached_preset(preset_data)
+
+
+def show_cached_preset(preset_data):
+    # Show the thumbnail of an already generated preset instead of rendering a preview
+    thumbnail = artifact_cache.thumbnail(preset_data)
+    if thumbnail is None:
+        return
+    if preview_job["after"] is not None:
+        root.after_cancel(preview_job["after"])
+        preview_job["after"] = None
+    show_preview(thumbnail)
+
+
+def apply_preset(preset_data):
+    # Update all parameter values
+    preset_data = dict(DEFAULT_PRESET, **preset_data)
+    seed_entry.delete(0, "end")
+    if preset_data["seed"] is not None:
+        # Older presets have no seed; a new one is drawn on generate
+        seed_entry.insert(0, str(preset_data["seed"]))
+    noise_type_dropdown.set(preset_data["noise_type"])
+    width_slider.set(preset_data["width"])
+    height_slider.set(preset_data["height"])
+    scale_slider.set(preset_data["scale"])
+    octaves_slider.set(preset_data["octaves"])
+    persistence_slider.set(preset_data["persistence"])
+    lacunarity_slider.set(preset_data["lacunarity"])
+    resolution_factor_slider.set(preset_data["resolution_factor"])
+    base_elevation_slider.set(preset_data["base_elevation"])
+    min_height_slider.set(preset_data["min_height"])
+    max_height_slider.set(preset_data["max_height"])
+    smoothness_slider.set(preset_data["smoothness"])
+    minVerticesX_slider.set(preset_data["minVerticesX"])
+    maxVerticesX_slider.set(preset_data["maxVerticesX"])
+    minVerticesY_slider.set(preset_data["minVerticesY"])
+    maxVerticesY_slider.set(preset_data["maxVerticesY"])
+    
+    # Update the labels
+    update_slider_label(width_label, "Mesh Width", preset_data["width"])
+    update_slider_label(height_label, "Mesh Height", preset_data["height"])
+    update_slider_label(scale_label, "Zoom Scale", preset_data["scale"])
+    update_slider_label(octaves_label, "Octaves", preset_data["octaves"])
+    update_slider_label(persistence_label, "Persistence", preset_data["persistence"])
+    update_slider_label(lacunarity_label, "Lacunarity", preset_data["lacunarity"])
+    update_slider_label(resolution_factor_label, "Resolution Factor", preset_data["resolution_factor"])
+    update_slider_label(base_elevation_label, "Base Elevation", preset_data["base_elevation"])
+    update_slider_label(min_height_label, "Min Height", preset_data["min_height"])
+    update_slider_label(max_height_label, "Max Height", preset_data["max_height"])
+    update_slider_label(smoothness_label, "Smoothness", preset_data["smoothness"])
+    update_slider_label(minVerticesX_label, "Min Vertices X", preset_data["minVerticesX"])
+    update_slider_label(maxVerticesX_label, "Max Vertices X", preset_data["maxVerticesX"])
+    update_slider_label(minVerticesY_label, "Min Vertices Y", preset_data["minVerticesY"])
+    update_slider_label(maxVerticesY_label, "Max Vertices Y", preset_data["maxVerticesY"])
+
+    # Object switches and densities are part of the preset hash as well
+    for switch, slider, label, kind in (
+        (add_trees_switch, trees_slider, trees_slider_label, "trees"),
+        (add_rocks_switch, rocks_slider, rocks_slider_label, "rocks"),
+        (add_sticks_switch, sticks_slider, sticks_slider_label, "sticks"),
+        (add_logs_switch, logs_slider, logs_slider_label, "logs"),
+        (add_bushes_switch, bushes_slider, bushes_slider_label, "bushes"),
+        (add_boulders_switch, boulders_slider, boulders_slider_label, "boulders"),
+        (add_volcano_switch, volcano_slider, volcano_slider_label, "volcano"),
+        (add_mushroom_switch, mushroom_slider, mushroom_slider_label, "mushroom"),
+    ):
+        switch.set(preset_data[f"add_{kind}"])
+        slider.set(preset_data[f"{kind}_density"])
+        update_slider_label(label, "Density", preset_data[f"{kind}_density"])
 
 
 def toggle_trees_visibility(*args):
@@ -493,6 +747,7 @@ presets_label.grid(row=1, column=0, padx=20, pady=(10, 0), sticky="w")
 presets_optionmenu = ctk.CTkOptionMenu(
     left_section,
     values=["Default"],
+    command=select_preset,
     width=200,
     fg_color="#b9bdbd",
     button_color="#9ca2a2",
@@ -562,6 +817,9 @@ frame_visualisation = ctk.CTkFrame(
 frame_visualisation.grid(row=0, column=0, pady=10, padx=10, sticky="nsew")
 frame_visualisation.columnconfigure(0, weight=1)
 
+preview_label = ctk.CTkLabel(frame_visualisation, text="")
+preview_label.grid(row=0, column=0, padx=10, pady=10, sticky="n")
+
 ############################################################################################################
 
 # FRAME_BASE_OBJECTS
@@ -982,6 +1240,7 @@ noise_type_label.grid(row=0, column=0, sticky="w")
 noise_type_dropdown = ctk.CTkOptionMenu(
     frame_base_noise,
     values=['Perlin', 'Simplex', 'Value', 'Cellular'],
+    command=schedule_preview,
     width=100,
     fg_color="#b9bdbd",
     button_color="#9ca2a2",
@@ -1102,6 +1361,16 @@ lacunarity_slider = ctk.CTkSlider(
 lacunarity_slider.grid(row=6, column=1, sticky="w", padx=(10, 0))
 lacunarity_slider.set(5)
 
+# SEED
+seed_label = ctk.CTkLabel(frame_base_noise, text="Seed: ", width=135, anchor="w")
+seed_label.grid(row=7, column=0, sticky="w", pady=(20, 0))
+
+seed_entry = ctk.CTkEntry(
+    frame_base_noise, width=150, placeholder_text="random"
+)
+seed_entry.grid(row=7, column=1, sticky="w", padx=(15, 0), pady=(20, 0))
+seed_entry.bind("<KeyRelease>", schedule_preview)
+
 ############################################################################################################
 
 # FRAME_BASE_TERRAIN
@@ -1343,4 +1612,31 @@ genmesh_button = ctk.CTkButton(
 genmesh_button.grid(row=3, column=0, columnspan=2, pady=(10, 10), sticky="s")
 left_section.rowconfigure(2, weight=1)
 
+# GENERATION PROGRESS (shown while a job runs)
+generation_frame = ctk.CTkFrame(left_section, fg_color="transparent")
+generation_frame.grid(row=4, column=0, columnspan=2, padx=20, pady=(0, 10), sticky="ew")
+generation_frame.columnconfigure(0, weight=1)
+
+generation_progressbar = ctk.CTkProgressBar(
+    generation_frame, progress_color="#62a5d9"
+)
+generation_progressbar.grid(row=0, column=0, sticky="ew")
+generation_progressbar.set(0)
+
+cancel_button = ctk.CTkButton(
+    generation_frame,
+    text="Cancel",
+    command=cancel_generation,
+    width=50,
+    fg_color="#9ca2a2",
+    hover_color="#838b8b",
+)
+cancel_button.grid(row=0, column=1, padx=(10, 0))
+
+generation_status_label = ctk.CTkLabel(generation_frame, text="", anchor="w")
+generation_status_label.grid(row=1, column=0, columnspan=2, sticky="w")
+generation_frame.grid_remove()
+
+schedule_preview()
+
 root.mainloop()
\ No newline at end of file
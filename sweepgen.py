@@ -0,0 +1,74 @@
+"""
+Headless parameter sweep.
+
+Expands parameter ranges into a grid of presets, generates each unique
+variant once on a pool of worker processes and writes a contact sheet
+(contact_sheet.png) and an index (index.json) to the output directory.
+Variants already generated by an earlier sweep into the same directory
+are reused.
+
+Example:
+    python sweepgen.py --base presets/hills.json --vary octaves=1:8 \
+        --vary persistence=1,2,4 -o GeneratedMeshes/sweep --jobs 8
+"""
+import argparse
+import os
+import sys
+import time
+
+from Controller.Gen.presets import load_preset
+from Controller.Gen.sweep import CONTACT_SHEET_NAME, INDEX_NAME, parse_values, run_sweep
+
+
+def parse_vary(text):
+    key, sep, values = text.partition("=")
+    if not sep or not values:
+        raise argparse.ArgumentTypeError(f"expected KEY=VALUES, got {text!r}")
+    try:
+        return key.strip(), parse_values(values)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a grid of terrain variants and a contact sheet.")
+    parser.add_argument("--base", help="Preset JSON file the swept values are applied to (default: GUI defaults)")
+    parser.add_argument("--vary", action="append", type=parse_vary, required=True, metavar="KEY=VALUES",
+                        help="Swept parameter, e.g. octaves=1:8, scale=50:200:50 or persistence=1,2,4")
+    parser.add_argument("-o", "--output", default=os.path.join("GeneratedMeshes", "sweep"), help="Output directory")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Number of worker processes")
+    parser.add_argument("--tile", type=int, default=128, help="Contact sheet tile size in pixels")
+    parser.add_argument("--columns", type=int, help="Contact sheet columns (default: square layout)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    base = load_preset(args.base) if args.base else {}
+    ranges = dict(args.vary)
+
+    def report(done, total, entry):
+        params = " ".join(f"{key}={value}" for key, value in entry["params"].items())
+        if "error" in entry:
+            print(f"[{done}/{total}] FAILED {params}: {entry['error']}", file=sys.stderr)
+        else:
+            how = "cached" if entry["cached"] else "done  "
+            print(f"[{done}/{total}] {how} {params} in {entry['seconds']:.2f}s -> {entry['dir']}")
+        sys.stdout.flush()
+
+    started = time.perf_counter()
+    try:
+        index = run_sweep(base, ranges, args.output, jobs=args.jobs, progress=report,
+                          tile=args.tile, columns=args.columns)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    failures = sum("error" in entry for entry in index)
+    print(f"{len(index) - failures}/{len(index)} variants finished in {time.perf_counter() - started:.2f}s")
+    print(f"Contact sheet: {os.path.join(args.output, CONTACT_SHEET_NAME)}")
+    print(f"Index: {os.path.join(args.output, INDEX_NAME)}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())